@@ -0,0 +1,312 @@
+"""Offline replay benchmarks for the tracking + simulation stack.
+
+Runs without a webcam or window, e.g. on headless CI:
+
+    python benchmark.py --landmarks session.npy
+    python benchmark.py --video clip.mp4 --json results.json
+    python benchmark.py --landmarks session.npy --baseline results.json
+    python benchmark.py --swarm 2000 --steps 500
+    python benchmark.py --swarm 5000 --separation 0.3
+    python benchmark.py --wav question.wav --repeat 5
+    python benchmark.py --llm 1000 --llm-latency 0.05
+    python benchmark.py --stream 2000 --steps 2000 --stream-rate 500
+
+Record a landmark log during a live session with `python main.py --record session.npy`.
+"""
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from gestures import GESTURES, classify_points
+from landmark_log import load_landmark_log, log_gesture_codes
+
+
+class StageTimer:
+    """Collects per-call durations for one pipeline stage"""
+    def __init__(self, name, items_per_call=1):
+        self.name = name
+        self.items_per_call = items_per_call
+        self.durations = []
+
+    def time(self, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.durations.append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        durations = np.asarray(self.durations)
+        total = durations.sum()
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99]) * 1000 if len(durations) else (0.0, 0.0, 0.0)
+        return {
+            'calls': len(durations),
+            'throughput': len(durations) * self.items_per_call / total if total > 0 else float('inf'),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+        }
+
+
+def print_report(results):
+    print(f"{'stage':<16}{'calls':>8}{'items/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in results.items():
+        print(f"{name:<16}{s['calls']:>8}{s['throughput']:>14.1f}"
+              f"{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}")
+
+
+def bench_landmarks(path, repeat=1, num_drones=2):
+    """Replay a recorded landmark log through classification and simulation"""
+    from simulator import DroneSimulator
+
+    log = load_landmark_log(path)
+    landmarks = np.ascontiguousarray(log['landmarks'])
+    handedness = np.ascontiguousarray(log['handedness'])
+    simulator = DroneSimulator(headless=True, num_drones=num_drones)
+
+    classify = StageTimer('classify')
+    batch = StageTimer('classify_batch', items_per_call=len(log))
+    update = StageTimer('update')
+
+    for _ in range(repeat):
+        for points, hands in zip(landmarks, handedness):
+            codes = classify.time(classify_points, points)
+            left, right = log_gesture_codes(codes, hands)
+            update.time(simulator.update, [GESTURES[left], GESTURES[right]])
+        batch.time(classify_points, landmarks)
+
+    return {t.name: t.summary() for t in (classify, batch, update)}
+
+
+def bench_swarm(num_drones, steps=500, seed=0, separation=None):
+    """Drive a swarm with scripted random per-drone command codes
+
+    With separation, a CollisionLayer keeps drones that far apart and its
+    share of each update is timed separately.
+    """
+    from simulator import DroneSimulator
+
+    simulator = DroneSimulator(headless=True, num_drones=num_drones)
+    rng = np.random.default_rng(seed)
+    script = rng.integers(0, len(GESTURES), size=(steps, num_drones), dtype=np.uint8)
+
+    update = StageTimer('update', items_per_call=num_drones)
+    collision = StageTimer('collision', items_per_call=num_drones)
+    if separation:
+        from collision import CollisionLayer
+        simulator.collision = CollisionLayer(separation)
+    for codes in script:
+        update.time(simulator.update, codes)
+        if simulator.collision is not None:
+            collision.durations.append(simulator.collision.last_seconds)
+
+    if simulator.collision is None:
+        return {update.name: update.summary()}
+    print(simulator.collision.report())
+    return {t.name: t.summary() for t in (update, collision)}
+
+
+def bench_stream(num_drones, frames=1000, rate=500.0, address='127.0.0.1:0'):
+    """Loopback pose streaming: publish cost, delivery latency and drops
+
+    A client thread subscribes, times every snapshot from its header
+    timestamp, and sends a command packet every 10 snapshots.
+    """
+    import threading
+    from simulator import DroneSimulator
+    from state_stream import POSE_DTYPE, StateStreamClient, StateStreamServer
+
+    simulator = DroneSimulator(headless=True, num_drones=num_drones)
+    server = StateStreamServer(simulator, address)
+    client = StateStreamClient(server.address)
+    latency = StageTimer('latency', items_per_call=num_drones)
+    publish = StageTimer('publish', items_per_call=num_drones)
+    done = threading.Event()
+
+    def consume():
+        while not done.is_set():
+            snapshot = client.receive(timeout=0.2)
+            if snapshot is None:
+                continue
+            latency.durations.append(time.time() - snapshot[1])
+            if client.frames % 10 == 0:
+                client.send_commands(["UP", "DOWN"])
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    deadline = time.monotonic() + 2.0
+    while not server.subscribers and time.monotonic() < deadline:
+        server.poll()
+        time.sleep(0.001)
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        server.poll()
+        commands = server.take_commands()
+        if commands is not None:
+            simulator.update(commands)
+        publish.time(server.publish)
+        next_frame = start + (frame + 1) / rate
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.1)
+    done.set()
+    consumer.join()
+
+    snapshot_bytes = num_drones * POSE_DTYPE.itemsize
+    print(f"{client.frames}/{frames} snapshots received ({client.dropped} dropped) at "
+          f"{client.frames / elapsed:.0f} Hz, {client.frames * snapshot_bytes / elapsed / 1e6:.1f} MB/s, "
+          f"{len(server._chunks)} datagrams per snapshot, {server.commands_received} command packets")
+    client.close()
+    server.close()
+    return {t.name: t.summary() for t in (publish, latency)}
+
+
+def bench_voice(path, repeat=1):
+    """Stream a WAV file through VoiceProcessor's endpointed recognizer"""
+    from voice_processor import VoiceProcessor
+
+    voice_processor = VoiceProcessor()
+    recognize = StageTimer('recognize')
+    finalize = StageTimer('finalize')
+    for _ in range(repeat):
+        text = recognize.time(voice_processor.transcribe_file, path)
+        finalize.durations.append(voice_processor.last_stats['finalize_seconds'])
+    audio = voice_processor.last_stats['audio_seconds']
+    print(f"Transcript: {text!r} ({audio:.2f} s of audio until endpoint)")
+
+    return {t.name: t.summary() for t in (recognize, finalize)}
+
+
+def bench_llm(requests, unique=50, latency=0.05, workers=8, seed=0):
+    """Load-test the cached async yes/no path against the offline stub backend"""
+    from llm_interface import LLMInterface, StubBackend
+
+    backend = StubBackend(latency=latency)
+    llm = LLMInterface(backend=backend, max_workers=workers)
+    rng = np.random.default_rng(seed)
+    questions = [f"Is {n} an even number?" for n in rng.integers(0, unique, size=requests)]
+
+    answer = StageTimer('answer')
+    futures = []
+    start = time.perf_counter()
+    for question in questions:
+        submitted_at = time.perf_counter()
+        future = llm.process_question_async(question)
+        future.add_done_callback(
+            lambda f, t=submitted_at: answer.durations.append(time.perf_counter() - t))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    wall = time.perf_counter() - start
+    llm.close()
+
+    print(f"{requests} requests in {wall:.2f} s ({requests / wall:.0f} req/s), "
+          f"{backend.calls} backend calls, {llm.cache_hits} cache hits")
+    return {answer.name: answer.summary()}
+
+
+def bench_video(path, max_frames=None, **tracker_options):
+    """Replay a video file through hand tracking and simulation"""
+    import cv2
+    from hand_tracking import HandTracker
+    from simulator import DroneSimulator
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {path}")
+    hand_tracker = HandTracker(**tracker_options)
+    simulator = DroneSimulator(headless=True)
+
+    decode = StageTimer('decode')
+    detect = StageTimer('detect_gestures')
+    update = StageTimer('update')
+
+    while max_frames is None or len(decode.durations) < max_frames:
+        ret, frame = decode.time(cap.read)
+        if not ret:
+            decode.durations.pop()
+            break
+        frame, left, right = detect.time(hand_tracker.detect_gestures, frame)
+        update.time(simulator.update, [left, right])
+    cap.release()
+    print(f"MediaPipe ran on {hand_tracker.frames_inferred} frames, "
+          f"skipped {hand_tracker.frames_skipped}")
+
+    return {t.name: t.summary() for t in (decode, detect, update)}
+
+
+def check_regressions(results, baseline, tolerance):
+    """Return stages whose p50 latency got worse than baseline by more than tolerance"""
+    regressions = []
+    for name, s in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['p50_ms']
+        if before > 0 and s['p50_ms'] > before * (1 + tolerance):
+            regressions.append(f"{name}: p50 {before:.3f} ms -> {s['p50_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline tracking + simulation benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--landmarks", help="recorded landmark log (.npy)")
+    source.add_argument("--video", help="video file to run hand tracking on")
+    source.add_argument("--swarm", type=int, metavar="N", help="scripted update of N drones")
+    source.add_argument("--wav", help="16 kHz mono WAV file to run speech recognition on")
+    source.add_argument("--llm", type=int, metavar="N", help="N yes/no questions against the stub LLM")
+    source.add_argument("--stream", type=int, metavar="N", help="loopback pose streaming of N drones")
+    parser.add_argument("--stream-rate", type=float, default=500.0, help="stream: snapshots per second")
+    parser.add_argument("--stream-address", default="127.0.0.1:0",
+                        help="stream: UDP host:port or a Unix socket path")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub LLM seconds per call")
+    parser.add_argument("--llm-unique", type=int, default=50, help="distinct questions for --llm")
+    parser.add_argument("--drones", type=int, default=2, help="simulated drones for landmark replay")
+    parser.add_argument("--steps", type=int, default=500, help="update steps for --swarm")
+    parser.add_argument("--separation", type=float, help="swarm: minimum drone spacing, enables collisions")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over a landmark log or WAV file")
+    parser.add_argument("--max-frames", type=int, help="stop a video replay after this many frames")
+    parser.add_argument("--inference-scale", type=float, default=1.0, help="video: hand tracking downscale")
+    parser.add_argument("--skip-stable", type=float, default=0.0, help="video: stable landmark threshold")
+    parser.add_argument("--max-skip", type=int, default=2, help="video: most consecutive skipped frames")
+    parser.add_argument("--no-overlay", action="store_true", help="video: skip landmark drawing")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against, exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args()
+
+    if args.landmarks:
+        results = bench_landmarks(args.landmarks, args.repeat, args.drones)
+    elif args.swarm:
+        results = bench_swarm(args.swarm, args.steps, separation=args.separation)
+    elif args.wav:
+        results = bench_voice(args.wav, args.repeat)
+    elif args.llm:
+        results = bench_llm(args.llm, args.llm_unique, args.llm_latency)
+    elif args.stream:
+        results = bench_stream(args.stream, args.steps, args.stream_rate, args.stream_address)
+    else:
+        results = bench_video(args.video, args.max_frames,
+                              inference_scale=args.inference_scale,
+                              stability_threshold=args.skip_stable,
+                              max_skip_frames=args.max_skip if args.skip_stable > 0 else 0,
+                              draw_overlay=not args.no_overlay)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
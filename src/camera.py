@@ -0,0 +1,22 @@
+import cv2
+
+def init_camera(index):
+    """Initialize camera with specific index"""
+    print(f"Attempting to initialize camera {index}...")
+    
+    # Try MacOS specific backend first
+    cap = cv2.VideoCapture(index + cv2.CAP_AVFOUNDATION)
+    
+    if not cap.isOpened():
+        print(f"Failed with AVFOUNDATION, trying default for camera {index}...")
+        cap = cv2.VideoCapture(index)
+    
+    if cap.isOpened():
+        # Set camera properties
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        print(f"Successfully opened camera {index}")
+        return cap
+    
+    print(f"Could not initialize camera {index}")
+    return None
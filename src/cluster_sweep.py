@@ -0,0 +1,262 @@
+"""Cached, parallel parameter sweeps for the movie clustering notebook
+
+The k-sweep splits k values into contiguous runs, one per worker process;
+within a run each k starts from the previous k's centroids plus one new
+seed, instead of refitting from scratch. The DBSCAN grid reuses a single
+radius-neighbors graph for every (eps, min_samples) pair. Results, including
+the k-means centroids and every DBSCAN fit's labels, are cached on disk keyed
+by the data and the sweep settings, so picking a fit never means refitting.
+
+    python cluster_sweep.py movies.csv --k 1 24 --workers 4 --plot elbow.png
+    python cluster_sweep.py movies.csv --eps 0.1 0.15 0.2 0.5 --min-samples 3 4 5
+    python cluster_sweep.py movies.csv --eps 0.1 0.15 0.2 0.5 --min-samples 3 4 5 --pick 0.15 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+CACHE_DIR = '.sweep_cache'
+CACHE_VERSION = 2
+# Result fields stored in the .npz, one array per result, rather than the JSON
+ARRAY_FIELDS = ('centroids', 'labels')
+
+
+def _cache_path(cache_dir, kind, X, settings):
+    digest = hashlib.sha256(np.ascontiguousarray(X).tobytes())
+    digest.update(json.dumps(dict(settings, cache_version=CACHE_VERSION), sort_keys=True).encode())
+    return os.path.join(cache_dir, f"{kind}-{digest.hexdigest()[:16]}")
+
+
+def _load_cached(path):
+    if not os.path.exists(path + '.json'):
+        return None
+    with open(path + '.json') as f:
+        results = json.load(f)
+    if os.path.exists(path + '.npz'):
+        with np.load(path + '.npz') as arrays:
+            for position, result in enumerate(results):
+                for field in ARRAY_FIELDS:
+                    if f"{field}_{position}" in arrays:
+                        result[field] = arrays[f"{field}_{position}"]
+    return results
+
+
+def _save_cached(path, results):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    arrays = {f"{field}_{position}": result[field]
+              for position, result in enumerate(results) for field in ARRAY_FIELDS if field in result}
+    if arrays:
+        np.savez(path + '.npz', **arrays)
+    with open(path + '.json', 'w') as f:
+        json.dump([{key: value for key, value in result.items() if key not in ARRAY_FIELDS}
+                   for result in results], f, indent=2)
+
+
+def _next_seed(X, centroids, rng):
+    """One extra initial centroid, chosen greedy k-means++ style
+
+    Several candidates are sampled proportionally to their squared distance
+    from the existing centroids; the one that lowers the potential most wins.
+    """
+    squared = np.min([((X - centroid) ** 2).sum(axis=1) for centroid in centroids], axis=0)
+    total = squared.sum()
+    if total == 0:
+        return X[rng.integers(len(X))]
+    trials = 2 + int(np.log(len(centroids) + 1))
+    candidates = X[rng.choice(len(X), size=trials, p=squared / total)]
+    potentials = [np.minimum(squared, ((X - candidate) ** 2).sum(axis=1)).sum() for candidate in candidates]
+    return candidates[int(np.argmin(potentials))]
+
+
+def _fit_k_run(X, ks, minibatch, warm_start, seed, threads, batch_size):
+    """Fit consecutive k values in one worker, seeding each from the last"""
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from threadpoolctl import threadpool_limits
+
+    rng = np.random.default_rng(seed + ks[0])
+    results = []
+    centroids = None
+    with threadpool_limits(limits=threads):
+        for k in ks:
+            if warm_start and centroids is not None and len(centroids) == k - 1:
+                init = np.vstack([centroids, _next_seed(X, centroids, rng)])
+            else:
+                init = 'k-means++'
+            if minibatch:
+                model = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, random_state=seed,
+                                        batch_size=batch_size)
+            else:
+                model = KMeans(n_clusters=k, init=init, n_init=1, random_state=seed)
+            start = time.perf_counter()
+            model.fit(X)
+            centroids = model.cluster_centers_
+            results.append({'k': k, 'inertia': float(model.inertia_), 'n_iter': int(model.n_iter_),
+                            'seconds': time.perf_counter() - start, 'centroids': centroids})
+    return results
+
+
+def kmeans_sweep(X, ks=range(1, 25), workers=None, minibatch=False, warm_start=True, seed=1,
+                 batch_size=4096, cache_dir=CACHE_DIR):
+    """Inertia (WCSS), iterations, fit time and centroids for every k"""
+    X = np.asarray(X, dtype=np.float64)
+    ks = sorted(ks)
+    workers = min(workers or os.cpu_count() or 1, len(ks))
+    settings = {'ks': ks, 'minibatch': minibatch, 'warm_start': warm_start, 'seed': seed,
+                'batch_size': batch_size if minibatch else None}
+    path = _cache_path(cache_dir, 'kmeans', X, settings) if cache_dir else None
+    cached = _load_cached(path) if path else None
+    if cached is not None:
+        print(f"Using cached k-sweep {path}.json")
+        return cached
+
+    # Contiguous runs of k keep the warm starts useful inside each worker
+    runs = [run for run in np.array_split(np.array(ks), workers) if len(run)]
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fit_k_run, X, run.tolist(), minibatch, warm_start, seed, threads, batch_size)
+                   for run in runs]
+        results = [result for future in futures for result in future.result()]
+    print(f"k-sweep over {len(ks)} values on {workers} workers in {time.perf_counter() - start:.1f} s")
+    if path:
+        _save_cached(path, results)
+    return results
+
+
+def neighbor_graph(X, radius):
+    """Sparse distance graph of all pairs within radius, computed once"""
+    from sklearn.neighbors import NearestNeighbors
+
+    return NearestNeighbors(radius=radius).fit(X).radius_neighbors_graph(mode='distance', sort_results=True)
+
+
+def dbscan_sweep(X, eps_values, min_samples_values, cache_dir=CACHE_DIR):
+    """Clusters, noise and labels for every (eps, min_samples) pair from one neighbor graph
+
+    DBSCAN runs on the precomputed graph, so each fit only filters stored
+    distances by eps rather than searching neighbors again. Each result
+    keeps its int32 labels, -1 for noise.
+    """
+    from sklearn.cluster import DBSCAN
+
+    X = np.asarray(X, dtype=np.float64)
+    eps_values = sorted(eps_values)
+    min_samples_values = sorted(min_samples_values)
+    settings = {'eps': eps_values, 'min_samples': min_samples_values}
+    path = _cache_path(cache_dir, 'dbscan', X, settings) if cache_dir else None
+    cached = _load_cached(path) if path else None
+    if cached is not None:
+        print(f"Using cached DBSCAN grid {path}.json")
+        return cached
+
+    start = time.perf_counter()
+    graph = neighbor_graph(X, eps_values[-1])
+    graph_seconds = time.perf_counter() - start
+    results = []
+    for eps in eps_values:
+        for min_samples in min_samples_values:
+            fit_start = time.perf_counter()
+            labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(graph)
+            sizes = np.bincount(labels[labels >= 0]) if (labels >= 0).any() else np.zeros(0, dtype=int)
+            results.append({
+                'eps': eps, 'min_samples': min_samples,
+                'clusters': int(len(sizes)),
+                'noise_fraction': float(np.mean(labels < 0)),
+                'largest_fraction': float(sizes.max() / len(labels)) if len(sizes) else 0.0,
+                'seconds': time.perf_counter() - fit_start,
+                'labels': labels.astype(np.int32),
+            })
+    print(f"DBSCAN grid of {len(results)} fits in {time.perf_counter() - start:.1f} s "
+          f"(neighbor graph {graph_seconds:.1f} s)")
+    if path:
+        _save_cached(path, results)
+    return results
+
+
+def pick_fit(results, eps, min_samples):
+    """The DBSCAN grid result for one (eps, min_samples) pair, labels included"""
+    for result in results:
+        if np.isclose(result['eps'], eps) and result['min_samples'] == min_samples:
+            return result
+    raise ValueError(f"eps={eps} min_samples={min_samples} is not in the grid")
+
+
+def assign(X, centroids):
+    """Cluster labels for X from sweep centroids, without refitting"""
+    X = np.asarray(X, dtype=np.float64)
+    squared = (np.einsum('ij,ij->i', X, X)[:, None] + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+               - 2.0 * X @ centroids.T)
+    return np.argmin(squared, axis=1)
+
+
+def plot_elbow(results, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    ks = [result['k'] for result in results]
+    plt.figure(figsize=(10, 6))
+    plt.plot(ks, [result['inertia'] for result in results], marker='o', linestyle='-', color='b')
+    plt.title('Elbow Method for Optimal k')
+    plt.xlabel('Number of Clusters (k)')
+    plt.ylabel('WCSS (Within-Cluster Sum of Squares)')
+    plt.xticks(ks)
+    plt.grid(True)
+    plt.savefig(path)
+    print(f"Saved elbow plot to {path}")
+
+
+def movie_features(path):
+    """Genre indicator matrix of movies.csv, as in recommendation_system.ipynb"""
+    import pandas as pd
+    from encoders import OneHotEncoder
+
+    df = pd.read_csv(path)
+    encoder = OneHotEncoder(columns=['genres'], multi_label=['genres'], sparse_output=False)
+    return encoder.fit_transform(df).astype(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("movies", help="movies.csv with a pipe-separated genres column")
+    parser.add_argument("--k", type=int, nargs=2, metavar=("MIN", "MAX"), help="k-sweep range, inclusive")
+    parser.add_argument("--workers", type=int, help="processes for the k-sweep (default: all cores)")
+    parser.add_argument("--minibatch", action="store_true", help="use MiniBatchKMeans for large inputs")
+    parser.add_argument("--cold", action="store_true", help="fit every k from k-means++ instead of warm starts")
+    parser.add_argument("--eps", type=float, nargs="+", help="DBSCAN eps values to try")
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[4], help="DBSCAN min_samples values")
+    parser.add_argument("--pick", nargs=2, metavar=("EPS", "MIN_SAMPLES"),
+                        help="save the labels of one DBSCAN grid point")
+    parser.add_argument("--labels", default="dbscan_labels.npy", help="where --pick saves the labels")
+    parser.add_argument("--plot", metavar="PATH", help="save the elbow plot")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    features = movie_features(args.movies)
+    if args.k:
+        results = kmeans_sweep(features, range(args.k[0], args.k[1] + 1), args.workers, args.minibatch,
+                               not args.cold, cache_dir=args.cache_dir)
+        for result in results:
+            print(f"k={result['k']:3d}  WCSS {result['inertia']:12.2f}  "
+                  f"{result['n_iter']:3d} iterations  {result['seconds']:.2f} s")
+        if args.plot:
+            plot_elbow(results, args.plot)
+    if args.eps:
+        # DBSCAN ran on standardized genres in the notebook
+        scale = features.std(axis=0)
+        scaled = (features - features.mean(axis=0)) / np.where(scale > 0, scale, 1.0)
+        results = dbscan_sweep(scaled, args.eps, args.min_samples, cache_dir=args.cache_dir)
+        for result in results:
+            print(f"eps={result['eps']:<6g} min_samples={result['min_samples']:<3d} "
+                  f"{result['clusters']:5d} clusters  {result['noise_fraction']:6.1%} noise")
+        if args.pick:
+            np.save(args.labels, pick_fit(results, float(args.pick[0]), int(args.pick[1]))['labels'])
+            print(f"Saved labels for eps={args.pick[0]} min_samples={args.pick[1]} to {args.labels}")
+
+
+if __name__ == "__main__":
+    main()
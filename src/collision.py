@@ -0,0 +1,123 @@
+import time
+import numpy as np
+from telemetry import telemetry
+
+# Cell coordinates are packed into one int64 key, 21 bits per axis
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+_NEIGHBOR_OFFSETS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+
+
+def _pack(cells):
+    cells = cells + _KEY_OFFSET
+    return (cells[..., 0] << (2 * _KEY_BITS)) | (cells[..., 1] << _KEY_BITS) | cells[..., 2]
+
+
+class SpatialHash:
+    """Uniform-grid spatial hash over a position array, rebuilt every step
+
+    Drones are sorted by cell key, so every occupied cell is one contiguous
+    run of the sorted order and a cell lookup is a binary search.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = None
+        self.order = None
+        self.keys = None
+        self.starts = None
+        self.counts = None
+
+    def build(self, positions):
+        self.cells = np.floor(positions / self.cell_size).astype(np.int64)
+        keys = _pack(self.cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True,
+                                                        return_counts=True)
+        return self
+
+    def candidate_pairs(self):
+        """(i, j) index arrays, i < j, of drones in the same or adjacent cells"""
+        n = len(self.cells)
+        # Keys of all 27 cells around every drone, looked up in one searchsorted
+        neighbor_keys = _pack(self.cells[:, None, :] + _NEIGHBOR_OFFSETS[None, :, :]).ravel()
+        slots = np.searchsorted(self.keys, neighbor_keys)
+        slots = np.minimum(slots, len(self.keys) - 1)
+        found = self.keys[slots] == neighbor_keys
+        owners = np.repeat(np.arange(n), len(_NEIGHBOR_OFFSETS))[found]
+        starts = self.starts[slots[found]]
+        counts = self.counts[slots[found]]
+
+        # Expand each (drone, cell) hit into one entry per cell member
+        first = np.repeat(owners, counts)
+        run_starts = np.cumsum(counts) - counts
+        positions = np.repeat(starts - run_starts, counts) + np.arange(counts.sum())
+        second = self.order[positions]
+        keep = first < second
+        return first[keep], second[keep]
+
+
+class CollisionLayer:
+    """Pushes apart drones closer than min_distance, using a SpatialHash
+
+    Each step the hash is rebuilt from the positions, candidate pairs come
+    from neighboring cells, and every overlapping pair is separated along
+    the line between them. Cost grows with drones times local density
+    rather than with all N² pairs.
+    """
+    def __init__(self, min_distance=0.6, iterations=2, stiffness=1.0, seed=0):
+        self.min_distance = min_distance
+        self.iterations = iterations
+        self.stiffness = stiffness
+        self.hash = SpatialHash(min_distance)
+        self._rng = np.random.default_rng(seed)
+        self.steps = 0
+        self.collisions = 0
+        self.last_collisions = 0
+        self.candidates = 0
+        self.last_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def overlapping_pairs(self, positions):
+        """(i, j, delta, distance) for pairs closer than min_distance"""
+        first, second = self.hash.build(positions).candidate_pairs()
+        self.candidates += len(first)
+        delta = positions[second] - positions[first]
+        distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        close = distance < self.min_distance
+        return first[close], second[close], delta[close], distance[close]
+
+    def apply(self, positions):
+        """Separate overlapping drones in place, returns the overlaps found"""
+        start = time.perf_counter()
+        with telemetry.stage("collision"):
+            found = 0
+            for iteration in range(self.iterations):
+                first, second, delta, distance = self.overlapping_pairs(positions)
+                if iteration == 0:
+                    found = len(first)
+                if not len(first):
+                    break
+                # Coincident drones get a random direction to split along
+                coincident = distance < 1e-9
+                if coincident.any():
+                    delta[coincident] = self._rng.normal(size=(int(coincident.sum()), 3))
+                    distance[coincident] = np.linalg.norm(delta[coincident], axis=1)
+                push = delta * ((self.min_distance - distance) * self.stiffness * 0.5 / distance)[:, None]
+                # A drone overlapping several others accumulates every push
+                n = len(positions)
+                for axis in range(3):
+                    positions[:, axis] += (np.bincount(second, push[:, axis], minlength=n)
+                                           - np.bincount(first, push[:, axis], minlength=n))
+        self.last_seconds = time.perf_counter() - start
+        self.total_seconds += self.last_seconds
+        self.steps += 1
+        self.last_collisions = found
+        self.collisions += found
+        return found
+
+    def report(self):
+        if not self.steps:
+            return "collision: no steps"
+        return (f"collision: {self.steps} steps, {self.total_seconds / self.steps * 1000:.2f} ms/step, "
+                f"{self.collisions} overlaps resolved ({self.last_collisions} last step), "
+                f"{self.candidates / self.steps:.0f} candidate pairs/step")
@@ -0,0 +1,334 @@
+"""Non-interactive categorical encoders
+
+Batch replacements for the encoders in oneHotEncoder.ipynb, ordinalEncoder.ipynb
+and the genre encoding in recommendation_system.ipynb: fit once, keep the
+category vocabulary, then transform any amount of new data consistently.
+
+    python encoders.py fit-ordinal exams.csv mappings.json --order sorted
+    python encoders.py ordinal exams.csv mappings.json encoded.csv --chunksize 500000
+    python encoders.py ordinal exams.csv mappings.json codes.npy
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from scipy import sparse
+from csv_utils import count_rows
+
+UNKNOWN = -1
+ORDERS = ('appearance', 'sorted', 'frequency')
+
+
+def object_columns(df):
+    """Columns the notebooks treat as categorical"""
+    return [col for col in df.columns
+            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])]
+
+
+class OneHotEncoder:
+    """Indicator matrices built from integer category codes in one scatter
+
+    multi_label lists columns holding several `sep`-delimited labels per row
+    (e.g. genres 'Action|Sci-Fi'); each label gets its own indicator. Values
+    never seen during fit encode as all zeros, or raise with
+    handle_unknown='error'.
+    """
+    def __init__(self, columns=None, multi_label=(), sep='|', sparse_output=True,
+                 handle_unknown='ignore'):
+        self.columns = columns
+        self.multi_label = set(multi_label)
+        self.sep = sep
+        self.sparse_output = sparse_output
+        self.handle_unknown = handle_unknown
+        self.categories_ = None
+
+    def _distinct(self, df, col):
+        """Factorize a column, then split only its distinct values into labels
+
+        Returns (codes, labels, ptr): row i holds labels[ptr[codes[i]]:ptr[codes[i] + 1]],
+        and codes is -1 for missing values. Columns like genres have far fewer
+        distinct strings than rows, so the Python-level split stays cheap.
+        """
+        codes, uniques = pd.factorize(df[col].to_numpy())
+        if col not in self.multi_label:
+            return codes, np.asarray(uniques, dtype=object), np.arange(len(uniques) + 1)
+        split = [value.split(self.sep) for value in uniques]
+        lengths = np.fromiter((len(labels) for labels in split), dtype=np.int64, count=len(split))
+        labels = np.array([label for labels in split for label in labels], dtype=object)
+        return codes, labels, np.concatenate([[0], np.cumsum(lengths)])
+
+    def fit(self, df):
+        columns = self.columns if self.columns is not None else object_columns(df)
+        self.categories_ = {}
+        for col in columns:
+            _, labels, _ = self._distinct(df, col)
+            # First-appearance order, like df[col].unique() in the notebook
+            self.categories_[col] = pd.unique(labels).tolist()
+        return self
+
+    @property
+    def feature_names_(self):
+        return [str(label) for categories in self.categories_.values() for label in categories]
+
+    def transform(self, df):
+        """(rows, indicators) CSR or dense uint8 matrix, columns in feature_names_ order"""
+        all_rows, all_columns = [], []
+        offset = 0
+        for col, categories in self.categories_.items():
+            codes, labels, ptr = self._distinct(df, col)
+            label_codes = pd.Index(categories).get_indexer(labels)
+            if self.handle_unknown == 'error' and (label_codes < 0).any():
+                unseen = pd.unique(labels[label_codes < 0])
+                raise ValueError(f"Column {col!r} has categories not seen during fit: {list(unseen[:10])}")
+
+            # Expand every row into one entry per label: the repeat trick turns
+            # per-row [start, end) ranges of `labels` into flat positions
+            rows = np.flatnonzero(codes >= 0)
+            starts = ptr[codes[rows]]
+            counts = ptr[codes[rows] + 1] - starts
+            rows = np.repeat(rows, counts)
+            run_starts = np.cumsum(counts) - counts
+            positions = np.repeat(starts - run_starts, counts) + np.arange(counts.sum())
+            columns = label_codes[positions]
+            known = columns >= 0
+            all_rows.append(rows[known])
+            all_columns.append(columns[known] + offset)
+            offset += len(categories)
+        rows = np.concatenate(all_rows) if all_rows else np.empty(0, dtype=np.int64)
+        columns = np.concatenate(all_columns) if all_columns else np.empty(0, dtype=np.int64)
+        shape = (len(df), offset)
+
+        if not self.sparse_output:
+            encoded = np.zeros(shape, dtype=np.uint8)
+            encoded[rows, columns] = 1
+            return encoded
+        encoded = sparse.csr_matrix((np.ones(len(rows), dtype=np.uint8), (rows, columns)), shape=shape)
+        # A label repeated within one row ('Drama|Drama') must still be a 0/1 indicator
+        encoded.sum_duplicates()
+        encoded.data[:] = 1
+        return encoded
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def transform_frame(self, df):
+        """df with each encoded column replaced by its indicator columns, like the notebook"""
+        encoded = self.transform(df)
+        if sparse.issparse(encoded):
+            indicators = pd.DataFrame.sparse.from_spmatrix(encoded, index=df.index, columns=self.feature_names_)
+        else:
+            indicators = pd.DataFrame(encoded, index=df.index, columns=self.feature_names_)
+        return pd.concat([df.drop(columns=list(self.categories_)), indicators], axis=1)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'type': 'onehot', 'sep': self.sep, 'multi_label': sorted(self.multi_label),
+                       'categories': self.categories_}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, **options):
+        with open(path) as f:
+            saved = json.load(f)
+        encoder = cls(columns=list(saved['categories']), multi_label=saved['multi_label'],
+                      sep=saved['sep'], **options)
+        encoder.categories_ = saved['categories']
+        return encoder
+
+
+def _code_dtype(max_value):
+    """Smallest signed integer type holding max_value and the -1 unknown code"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class OrdinalEncoder:
+    """Maps categories to integer ranks, from a mapping file or inferred
+
+    mappings is {column: {category: rank}}, as written by save(); columns
+    without a mapping get one inferred at fit time, ordered by first
+    appearance, sorted value or descending frequency. Categories not in the
+    mapping encode as -1.
+    """
+    def __init__(self, columns=None, mappings=None, order='appearance'):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}, expected one of {ORDERS}")
+        self.columns = columns
+        self.order = order
+        self.mappings_ = {col: dict(mapping) for col, mapping in (mappings or {}).items()}
+        self._lookups = {}
+
+    def _ranks(self, counts):
+        """Mapping from {category: count}, with categories in first-appearance order"""
+        if self.order == 'sorted':
+            categories = sorted(counts)
+        elif self.order == 'frequency':
+            # Stable sort, so ties keep first-appearance order like value_counts
+            categories = sorted(counts, key=lambda category: -counts[category])
+        else:
+            categories = list(counts)
+        return {category: rank for rank, category in enumerate(categories)}
+
+    def _count(self, values, counts):
+        """Add one column's category counts to counts, missing values excluded"""
+        value_counts = values.value_counts(sort=False)
+        for category, count in zip(value_counts.index.tolist(), value_counts.tolist()):
+            counts[category] = counts.get(category, 0) + count
+        return counts
+
+    def fit(self, df):
+        columns = self.columns if self.columns is not None else object_columns(df)
+        for col in columns:
+            if col not in self.mappings_:
+                self.mappings_[col] = self._ranks(self._count(df[col], {}))
+        self._lookups = {}
+        return self
+
+    def fit_csv(self, path, chunksize=500000):
+        """Infer mappings over every row of a CSV, reading it chunk by chunk
+
+        Gives the same mappings as fit(pd.read_csv(path)) without loading the
+        whole file; only the distinct categories and their counts are kept.
+        """
+        columns = self.columns
+        counts = {}
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+            if columns is None:
+                columns = object_columns(chunk)
+            for col in columns:
+                if col not in self.mappings_:
+                    self._count(chunk[col], counts.setdefault(col, {}))
+        for col, col_counts in counts.items():
+            self.mappings_[col] = self._ranks(col_counts)
+        self._lookups = {}
+        return self
+
+    def _lookup(self, col):
+        """(categories index, rank array, output dtype) for one column, built once"""
+        lookup = self._lookups.get(col)
+        if lookup is None:
+            mapping = self.mappings_[col]
+            ranks = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+            dtype = _code_dtype(int(ranks.max()) if len(ranks) else 0)
+            lookup = self._lookups[col] = (pd.Index(list(mapping)), ranks.astype(dtype), dtype)
+        return lookup
+
+    def encode(self, values, col):
+        """Ranks of one column as a compact integer array"""
+        categories, ranks, dtype = self._lookup(col)
+        if categories.inferred_type == 'string' and not (
+                pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            # Mappings loaded from JSON always have string keys
+            values = values.astype(str)
+        # Factorize first so the hash lookup only runs over distinct values
+        codes, uniques = pd.factorize(values.to_numpy())
+        unique_ranks = categories.get_indexer(uniques)
+        unique_ranks = np.where(unique_ranks >= 0, ranks[unique_ranks], UNKNOWN).astype(dtype)
+        return np.where(codes >= 0, unique_ranks[codes], UNKNOWN).astype(dtype)
+
+    def transform(self, df):
+        """Copy of df with every mapped column replaced by its ranks"""
+        encoded = df.copy()
+        for col in self.mappings_:
+            encoded[col] = self.encode(df[col], col)
+        return encoded
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def transform_csv(self, path, out_path, chunksize=500000):
+        """Encode a CSV chunk by chunk
+
+        A .npy out_path receives only the encoded columns as one compact
+        integer matrix; any other out_path gets the full CSV with the mapped
+        columns replaced.
+        """
+        columns = list(self.mappings_)
+        rows = 0
+        if out_path.endswith('.npy'):
+            dtype = np.result_type(*(self._lookup(col)[2] for col in columns))
+            expected = count_rows(path)
+            # Written under a temporary name, so a failed run leaves no .npy behind
+            tmp_path = out_path + '.tmp'
+            out = open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(expected, len(columns)))
+            try:
+                for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+                    if rows + len(chunk) > expected:
+                        raise ValueError(f"{path} has more rows than the {expected} counted, file changed?")
+                    for position, col in enumerate(columns):
+                        out[rows:rows + len(chunk), position] = self.encode(chunk[col], col)
+                    rows += len(chunk)
+                # Unwritten rows would read as rank 0, a real category
+                if rows != expected:
+                    raise ValueError(f"{path} has {rows} rows but {expected} were counted, file changed?")
+                out.flush()
+            except BaseException:
+                del out
+                os.remove(tmp_path)
+                raise
+            del out
+            os.replace(tmp_path, out_path)
+        else:
+            for chunk in pd.read_csv(path, chunksize=chunksize):
+                self.transform(chunk).to_csv(out_path, mode='w' if rows == 0 else 'a',
+                                             header=rows == 0, index=False)
+                rows += len(chunk)
+        return rows
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'type': 'ordinal', 'mappings': self.mappings_}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, **options):
+        """Load a saved encoder, or a plain {column: {category: rank}} mapping file"""
+        with open(path) as f:
+            saved = json.load(f)
+        mappings = saved['mappings'] if saved.get('type') == 'ordinal' else saved
+        for col, mapping in mappings.items():
+            if any(not isinstance(rank, int) or rank < 0 for rank in mapping.values()):
+                raise ValueError(f"Mapping for {col!r} must use non-negative integer ranks")
+        return cls(columns=list(mappings), mappings=mappings, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit = commands.add_parser("fit-ordinal", help="infer ordinal mappings from a CSV and save them")
+    fit.add_argument("data")
+    fit.add_argument("mappings")
+    fit.add_argument("--columns", nargs="+", help="columns to encode (default: all text columns)")
+    fit.add_argument("--order", choices=ORDERS, default="appearance")
+    fit.add_argument("--chunksize", type=int, default=500000)
+    fit.add_argument("--rows", type=int,
+                     help="infer from only the first ROWS rows (default: every row)")
+
+    ordinal = commands.add_parser("ordinal", help="encode a CSV with saved ordinal mappings")
+    ordinal.add_argument("data")
+    ordinal.add_argument("mappings")
+    ordinal.add_argument("output", help=".npy for a compact code matrix, otherwise CSV")
+    ordinal.add_argument("--chunksize", type=int, default=500000)
+    args = parser.parse_args()
+
+    if args.command == "fit-ordinal":
+        encoder = OrdinalEncoder(args.columns, order=args.order)
+        if args.rows is None:
+            encoder.fit_csv(args.data, args.chunksize)
+        else:
+            print(f"Warning: inferring categories from the first {args.rows} rows only, "
+                  f"categories that first appear later will encode as {UNKNOWN}")
+            encoder.fit(pd.read_csv(args.data, nrows=args.rows, usecols=args.columns))
+        encoder.save(args.mappings)
+        for col, mapping in encoder.mappings_.items():
+            print(f"{col}: {mapping}")
+    else:
+        rows = OrdinalEncoder.load(args.mappings).transform_csv(args.data, args.output, args.chunksize)
+        print(f"Encoded {rows} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Columns create_features in here_we_go_again.ipynb never turns into features
+EXCLUDED_COLUMNS = ('id', 'flood_probability')
+RATIO_EPSILON = 1e-8
+CHUNK_ROWS = 65536
+
+
+def feature_columns(df):
+    """Numeric input columns in frame order, without id and target"""
+    return [col for col in df.select_dtypes(include=[np.number]).columns
+            if col not in EXCLUDED_COLUMNS]
+
+
+def feature_names(columns):
+    """Output column names, in the same order as the notebook's create_features
+
+    The base columns come first, then an interact/ratio pair for every column
+    pair (i < j), then a squared/cubed pair for every column.
+    """
+    names = list(columns)
+    for i in range(len(columns)):
+        for j in range(i + 1, len(columns)):
+            names.append(f'{columns[i]}_{columns[j]}_interact')
+            names.append(f'{columns[i]}_{columns[j]}_ratio')
+    for col in columns:
+        names.append(f'{col}_squared')
+        names.append(f'{col}_cubed')
+    return names
+
+
+def num_features(num_columns):
+    return num_columns + num_columns * (num_columns - 1) + 2 * num_columns
+
+
+def build_features(values, out=None, chunk_rows=CHUNK_ROWS):
+    """Fill a float32 (rows, num_features) matrix from a (rows, columns) array
+
+    Rows are processed chunk_rows at a time, so the float64 temporaries stay
+    bounded no matter how large the input is. Pass `out` to write into an
+    existing array (e.g. a slice of a memmap).
+    """
+    values = np.asarray(values)
+    rows, k = values.shape
+    if out is None:
+        out = np.empty((rows, num_features(k)), dtype=np.float32)
+    elif out.shape != (rows, num_features(k)):
+        raise ValueError(f"out has shape {out.shape}, expected {(rows, num_features(k))}")
+
+    first, second = np.triu_indices(k, 1)
+    pairs_end = k + 2 * len(first)
+    for start in range(0, rows, chunk_rows):
+        block = values[start:start + chunk_rows].astype(np.float64, copy=False)
+        target = out[start:start + chunk_rows]
+        target[:, :k] = block
+        # Gather both sides of every pair once, products and ratios are then
+        # one broadcast each; the interleaved slices match the notebook order
+        a = block[:, first]
+        b = block[:, second]
+        target[:, k:pairs_end:2] = a * b
+        target[:, k + 1:pairs_end:2] = a / (b + RATIO_EPSILON)
+        squared = block * block
+        target[:, pairs_end::2] = squared
+        target[:, pairs_end + 1::2] = squared * block
+    return out
+
+
+def create_features(df, chunk_rows=CHUNK_ROWS):
+    """Feature matrix and column names for a train or test frame"""
+    columns = feature_columns(df)
+    features = build_features(df[columns].to_numpy(), chunk_rows=chunk_rows)
+    return features, feature_names(columns)
+
+
+def iter_csv_features(path, chunksize=CHUNK_ROWS, columns=None):
+    """Stream a CSV as (ids, features, target) chunks with bounded memory
+
+    target is None when the file has no flood_probability column (test set).
+    Pass the training columns to featurize test data in the same layout.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if columns is None:
+            columns = feature_columns(chunk)
+        ids = chunk['id'].to_numpy() if 'id' in chunk else None
+        target = chunk['flood_probability'].to_numpy() if 'flood_probability' in chunk else None
+        yield ids, build_features(chunk[columns].to_numpy()), target
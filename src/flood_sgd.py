@@ -0,0 +1,169 @@
+"""Out-of-core SGDRegressor training for the flood-probability competition
+
+Three passes over the CSVs in fixed-size chunks, so peak memory is bounded by
+the chunk size rather than the dataset:
+
+    1. fit StandardScaler incrementally and index the byte range of every chunk
+    2. partial_fit SGDRegressor for several epochs, visiting chunks in shuffled order
+    3. stream test predictions to the submission file
+
+Usage:
+    python flood_sgd.py train.csv test.csv submission.csv
+    python flood_sgd.py train.csv test.csv submission.csv --epochs 5 --chunksize 100000 --engineered
+"""
+import argparse
+import io
+import itertools
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+from flood_features import build_features, feature_columns
+
+TARGET = 'flood_probability'
+
+
+class PassTimer:
+    """Rows/sec for one pass over the data"""
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        print(f"{self.name}: {self.rows} rows in {elapsed:.2f} s ({rate:,.0f} rows/s)")
+
+
+def iter_chunks(path, chunksize):
+    """Yield (offset, size, chunk) for every chunk of up to chunksize lines
+
+    The file is read once; each chunk is parsed from its own bytes, and its
+    byte range is returned so later passes can re-read exactly that chunk.
+    Chunks with no rows (e.g. trailing blank lines) are skipped.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline().decode().strip().split(',')
+        offset = f.tell()
+        while True:
+            data = b''.join(itertools.islice(f, chunksize))
+            if not data:
+                return
+            chunk = read_chunk(header, data)
+            if len(chunk):
+                yield offset, len(data), chunk
+            offset += len(data)
+
+
+def read_chunk(header, data):
+    return pd.read_csv(io.BytesIO(data), header=None, names=header)
+
+
+def load_chunk(path, header, offset, size):
+    """Re-read one chunk indexed by iter_chunks"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return read_chunk(header, f.read(size))
+
+
+class StreamingSGD:
+    """StandardScaler + SGDRegressor trained chunk by chunk from CSV files"""
+    def __init__(self, chunksize=100000, epochs=3, engineered=False, seed=0, **sgd_options):
+        self.chunksize = chunksize
+        self.epochs = epochs
+        self.engineered = engineered
+        self.rng = np.random.default_rng(seed)
+        self.scaler = StandardScaler()
+        self.model = SGDRegressor(random_state=seed, **sgd_options)
+        self.columns = None
+        self._header = None
+        self._chunks = None
+
+    def _features(self, chunk):
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        return build_features(values) if self.engineered else values
+
+    def fit_scaler(self, train_path):
+        """Pass 1: incremental scaler fit and chunk byte-range index"""
+        timer = PassTimer("pass 1 (scaler)")
+        self._chunks = []
+        for offset, size, chunk in iter_chunks(train_path, self.chunksize):
+            self._chunks.append((offset, size))
+            if self.columns is None:
+                self._header = list(chunk.columns)
+                self.columns = feature_columns(chunk)
+            self.scaler.partial_fit(self._features(chunk))
+            timer.add(len(chunk))
+        timer.report()
+
+    def train(self, train_path):
+        """Pass 2: partial_fit over shuffled chunks for every epoch
+
+        Each chunk is scored before the model learns from it, which gives a
+        progressive-validation R² per epoch without an extra pass.
+        """
+        for epoch in range(self.epochs):
+            timer = PassTimer(f"pass 2 (epoch {epoch + 1}/{self.epochs})")
+            squared_error = total = total_sq = 0.0
+            scored = 0
+            for position in self.rng.permutation(len(self._chunks)):
+                chunk = load_chunk(train_path, self._header, *self._chunks[position])
+                order = self.rng.permutation(len(chunk))
+                X = self.scaler.transform(self._features(chunk))[order]
+                y = chunk[TARGET].to_numpy()[order]
+                if hasattr(self.model, 'coef_'):
+                    squared_error += float(np.sum((self.model.predict(X) - y) ** 2))
+                    total += float(y.sum())
+                    total_sq += float(np.sum(y ** 2))
+                    scored += len(y)
+                self.model.partial_fit(X, y)
+                timer.add(len(chunk))
+            timer.report()
+            variance = total_sq - total ** 2 / scored if scored else 0.0
+            if variance > 0:
+                print(f"  progressive R²: {1 - squared_error / variance:.4f}")
+
+    def predict_to_csv(self, test_path, submission_path):
+        """Pass 3: stream test predictions into the submission file"""
+        timer = PassTimer("pass 3 (predict)")
+        with open(submission_path, 'w', newline='') as out:
+            out.write(f"id,{TARGET}\n")
+            for chunk in pd.read_csv(test_path, chunksize=self.chunksize):
+                if not len(chunk):
+                    continue
+                predictions = self.model.predict(self.scaler.transform(self._features(chunk)))
+                pd.DataFrame({'id': chunk['id'], TARGET: predictions}).to_csv(
+                    out, header=False, index=False)
+                timer.add(len(chunk))
+        timer.report()
+
+    def run(self, train_path, test_path, submission_path):
+        self.fit_scaler(train_path)
+        self.train(train_path)
+        self.predict_to_csv(test_path, submission_path)
+        print(f"Submission written to {submission_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("train")
+    parser.add_argument("test")
+    parser.add_argument("submission")
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--engineered", action="store_true",
+                        help="train on the pairwise/polynomial features from flood_features")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    StreamingSGD(args.chunksize, args.epochs, args.engineered, args.seed).run(
+        args.train, args.test, args.submission)
+
+
+if __name__ == "__main__":
+    main()
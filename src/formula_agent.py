@@ -0,0 +1,306 @@
+"""Two-stage formula agent from prompt.ipynb with local routing and caching
+
+The notebook's sasta_agent always asks the model which formula applies,
+then asks it to solve the question. Here a keyword router over the FORMULAS
+table picks the formula locally when it is confident, solved questions
+persist in an sqlite cache, and batches run on a rate-limited thread pool.
+
+    python formula_agent.py "What is the area of a circle with radius 3?" --api-key KEY
+    python formula_agent.py --fake 2000 --latency 0.05 --rate 50 --workers 8
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from llm_interface import GeminiBackend
+
+# Keyword weights drive the local router; solve_prompt is the notebook's second prompt
+FORMULAS = {
+    'a': {
+        'text': "Area of a circle = π * r^2",
+        'solve_prompt': "Using the formula π * r^2, solve the question: {question}",
+        'keywords': {'circle': 3, 'circular': 3, 'radius': 3, 'diameter': 3, 'circumference': 2,
+                     'disc': 2, 'disk': 2, 'pi': 2, 'π': 2, 'round': 1, 'area': 1},
+    },
+    'b': {
+        'text': "Quadratic formula = (-b ± √(b^2 - 4ac)) / 2a",
+        'solve_prompt': "Using the quadratic formula, solve the question: {question}",
+        'keywords': {'quadratic': 4, 'roots': 3, 'root': 2, 'x^2': 3, 'x²': 3, 'discriminant': 4,
+                     'parabola': 3, 'equation': 1, 'solve for x': 2, 'zeros': 2},
+    },
+    'c': {
+        'text': "Pythagorean theorem = a^2 + b^2 = c^2",
+        'solve_prompt': "Using the Pythagorean theorem, solve the question: {question}",
+        'keywords': {'pythagorean': 4, 'pythagoras': 4, 'hypotenuse': 4, 'right triangle': 4,
+                     'right-angled': 4, 'right angled': 4, 'triangle': 2, 'legs': 2, 'ladder': 2,
+                     'diagonal': 2, 'sides': 1},
+    },
+}
+
+FORMULA_TABLE = "\n" + "".join(f"Formula {letter}: {formula['text']}\n" for letter, formula in FORMULAS.items())
+
+ROUTE_PROMPT = """
+    You are an expert mathematician. Based on the formulas below, choose the most relevant one for solving the question:
+    {formulas}
+    Question: {question}
+    Answer with only 'a', 'b', or 'c'."""
+
+_KEYWORD_PATTERNS = {
+    letter: [(re.compile(r'(?<!\w)' + re.escape(keyword) + r'(?!\w)'), weight)
+             for keyword, weight in formula['keywords'].items()]
+    for letter, formula in FORMULAS.items()
+}
+
+
+def question_key(question):
+    """Cache and dedup key: lowercased with whitespace collapsed
+
+    Unlike the yes/no cache key, nothing else is dropped; signs, operators
+    and decimals change the answer to a math question.
+    """
+    return " ".join(question.lower().split())
+
+
+def keyword_scores(question):
+    text = question.lower()
+    return {letter: sum(weight for pattern, weight in patterns if pattern.search(text))
+            for letter, patterns in _KEYWORD_PATTERNS.items()}
+
+
+def route_locally(question, min_score=3, margin=2):
+    """Formula letter when the keyword scores are decisive, otherwise None"""
+    scores = keyword_scores(question)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+    if best_score >= min_score and best_score - runner_up >= margin:
+        return best
+    return None
+
+
+def parse_formula_choice(reply):
+    """Letter from the model's routing reply, tolerating 'Formula b.' and similar"""
+    reply = reply.strip().lower()
+    if reply in FORMULAS:
+        return reply
+    letters = set(re.findall(r'(?<![\w])([abc])(?![\w])', reply))
+    if len(letters) == 1:
+        return letters.pop()
+    raise ValueError(f"Invalid formula selection by the model: {reply!r}")
+
+
+class FakeFormulaBackend:
+    """Offline stand-in for the model: routes by keywords, answers deterministically"""
+    def __init__(self, latency=0.0, verbose_rate=0.2, seed=0):
+        self.latency = latency
+        self.verbose_rate = verbose_rate
+        self.calls = 0
+        self.route_calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None):
+        with self._lock:
+            self.calls += 1
+            is_route = prompt.rstrip().endswith("Answer with only 'a', 'b', or 'c'.")
+            self.route_calls += is_route
+            verbose = self._rng.random() < self.verbose_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if is_route:
+            question = prompt.rsplit("Question:", 1)[1]
+            scores = keyword_scores(question)
+            letter = max(scores, key=scores.get)
+            # Real models sometimes wrap the letter in a sentence
+            return f"Formula {letter}." if verbose else letter
+        return f"Answer {zlib.crc32(prompt.encode()) % 1000}"
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`"""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AnswerCache:
+    """Solved questions persisted in sqlite, keyed by question_key()"""
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS answers "
+                             "(key TEXT PRIMARY KEY, formula TEXT, answer TEXT, created REAL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT formula, answer FROM answers WHERE key = ?", (key,)).fetchone()
+        return row
+
+    def put(self, key, formula, answer):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                             (key, formula, answer, time.time()))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+class FormulaAgent:
+    """sasta_agent with a local router, a persistent cache and batch solving"""
+    def __init__(self, backend, cache_path=None, rate=None, burst=1, max_workers=4,
+                 min_score=3, margin=2, timeout=30.0):
+        self.backend = backend
+        self.cache = AnswerCache(cache_path) if cache_path else None
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.max_workers = max_workers
+        self.min_score = min_score
+        self.margin = margin
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.stats = {'questions': 0, 'cache_hits': 0, 'local_routes': 0, 'llm_routes': 0, 'llm_calls': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _generate(self, prompt):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        self._count('llm_calls')
+        return self.backend.generate(prompt, timeout=self.timeout).strip()
+
+    def choose_formula(self, question):
+        """(letter, 'local' or 'llm'), asking the model only when the router is unsure"""
+        letter = route_locally(question, self.min_score, self.margin)
+        if letter is not None:
+            self._count('local_routes')
+            return letter, 'local'
+        self._count('llm_routes')
+        reply = self._generate(ROUTE_PROMPT.format(formulas=FORMULA_TABLE, question=question))
+        return parse_formula_choice(reply), 'llm'
+
+    def solve(self, question):
+        """{'question', 'formula', 'answer', 'source'}, source being cache, local or llm"""
+        self._count('questions')
+        key = question_key(question)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count('cache_hits')
+                return {'question': question, 'formula': cached[0], 'answer': cached[1], 'source': 'cache'}
+        letter, source = self.choose_formula(question)
+        answer = self._generate(FORMULAS[letter]['solve_prompt'].format(question=question))
+        if self.cache is not None:
+            self.cache.put(key, letter, answer)
+        return {'question': question, 'formula': letter, 'answer': answer, 'source': source}
+
+    def _solve_safely(self, question):
+        try:
+            return self.solve(question)
+        except Exception as e:
+            return {'question': question, 'formula': None, 'answer': None, 'error': f"{type(e).__name__}: {e}"}
+
+    def solve_batch(self, questions):
+        """Solve many questions concurrently; results follow the input order
+
+        Questions with the same question_key() are solved once.
+        """
+        unique = {}
+        for question in questions:
+            unique.setdefault(question_key(question), question)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            solved = dict(zip(unique, pool.map(self._solve_safely, unique.values())))
+        return [dict(solved[question_key(question)], question=question) for question in questions]
+
+    def calls_saved(self):
+        """Model calls avoided compared with two calls per question in the notebook"""
+        return 2 * self.stats['questions'] - self.stats['llm_calls']
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+
+SAMPLE_QUESTIONS = [
+    "What is the area of a circle with radius {n}?",
+    "A circular garden has a diameter of {n} m. How much area does it cover?",
+    "Find the roots of x^2 - {n}x + 6 = 0.",
+    "Solve the quadratic equation 2x^2 + {n}x - 3 = 0.",
+    "A right triangle has legs of {n} and 4. How long is the hypotenuse?",
+    "A ladder {n} m long leans against a wall 3 m from its base. How high does it reach?",
+    "A pizza is {n} inches across. What is its area?",
+    "What is x if x times x plus {n} x equals 10?",
+    "How far is it diagonally across a {n} by 5 rectangle?",
+]
+
+
+def run_fake_benchmark(count, latency, rate, workers, cache_path, seed=0):
+    rng = random.Random(seed)
+    questions = [rng.choice(SAMPLE_QUESTIONS).format(n=rng.randint(1, 50)) for _ in range(count)]
+    backend = FakeFormulaBackend(latency)
+    agent = FormulaAgent(backend, cache_path, rate=rate, burst=max(1, workers), max_workers=workers)
+    start = time.perf_counter()
+    results = agent.solve_batch(questions)
+    elapsed = time.perf_counter() - start
+    errors = sum('error' in result for result in results)
+    stats = agent.stats
+    print(f"{count} questions ({stats['questions']} distinct) in {elapsed:.2f} s "
+          f"-> {count / elapsed:.1f} questions/s")
+    print(f"  model calls {stats['llm_calls']} vs {2 * count} in the notebook "
+          f"({2 * count - stats['llm_calls']} saved), errors {errors}")
+    print(f"  routed locally {stats['local_routes']}, by model {stats['llm_routes']}, "
+          f"cache hits {stats['cache_hits']}")
+    agent.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", nargs="*", help="questions to solve with the real model")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--fake", type=int, metavar="N", help="benchmark N generated questions on a fake backend")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake backend seconds per call")
+    parser.add_argument("--rate", type=float, help="max model calls per second")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cache", metavar="PATH", help="sqlite file for solved questions")
+    args = parser.parse_args()
+
+    if args.fake:
+        run_fake_benchmark(args.fake, args.latency, args.rate, args.workers, args.cache)
+        return
+    if not args.questions:
+        parser.error("give questions to solve, or --fake N")
+    agent = FormulaAgent(GeminiBackend(args.api_key), args.cache, rate=args.rate, max_workers=args.workers)
+    for result in agent.solve_batch(args.questions):
+        if 'error' in result:
+            print(f"{result['question']}\n  Error: {result['error']}")
+        else:
+            print(f"{result['question']}\n  Formula {result['formula']} ({result['source']}): {result['answer']}")
+    agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import numpy as np
+
+# Gesture names indexed by their integer code, code 0 means no gesture
+GESTURES = (None, "STOP", "UP", "DOWN", "LEFT", "RIGHT", "FORWARD", "BACKWARD", "CIRCLE")
+GESTURE_CODES = {name: code for code, name in enumerate(GESTURES)}
+
+# MediaPipe hand landmark indices
+THUMB_BASE = 2
+THUMB_TIP = 4
+INDEX_BASE = 5
+INDEX_TIP = 8
+MIDDLE_BASE = 9
+MIDDLE_TIP = 12
+RING_TIP = 16
+PINKY_BASE = 17
+PINKY_TIP = 20
+PALM_CENTER = 9
+FINGER_TIPS = [INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP]
+
+# Finger state predicates, one bit each
+THUMB_EXTENDED = 1 << 0
+INDEX_RAISED = 1 << 1
+MIDDLE_RAISED = 1 << 2
+PINKY_RAISED = 1 << 3
+PINKY_LOWERED = 1 << 4
+FIST = 1 << 5
+PINCH = 1 << 6
+THUMB_POINTS_LEFT = 1 << 7
+RIGHT_HAND = 1 << 8
+NUM_STATE_BITS = 9
+
+FINGER_THRESHOLD = 0.1
+FIST_THRESHOLD = 0.1
+PINCH_THRESHOLD = 0.08
+
+
+def landmarks_to_array(multi_hand_landmarks):
+    """Copy every detected hand's landmarks into one (hands, 21, 3) float32 array"""
+    return np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in multi_hand_landmarks],
+        dtype=np.float32
+    ).reshape(-1, 21, 3)
+
+
+def finger_state_masks(points):
+    """Evaluate every finger state predicate for (..., 21, 3) landmarks at once"""
+    points = np.asarray(points, dtype=np.float32)
+    x = points[..., 0]
+    y = points[..., 1]
+
+    thumb_dx = x[..., THUMB_TIP] - x[..., THUMB_BASE]
+    pinky_dy = y[..., PINKY_TIP] - y[..., PINKY_BASE]
+    tips_to_palm = np.linalg.norm(points[..., FINGER_TIPS, :] - points[..., PALM_CENTER, None, :], axis=-1)
+    pinch = np.linalg.norm(points[..., THUMB_TIP, :] - points[..., INDEX_TIP, :], axis=-1)
+
+    mask = (np.abs(thumb_dx) > FINGER_THRESHOLD).astype(np.uint16) * THUMB_EXTENDED
+    mask |= (y[..., INDEX_TIP] < y[..., INDEX_BASE] - FINGER_THRESHOLD) * np.uint16(INDEX_RAISED)
+    mask |= (y[..., MIDDLE_TIP] < y[..., MIDDLE_BASE] - FINGER_THRESHOLD) * np.uint16(MIDDLE_RAISED)
+    mask |= (pinky_dy < -FINGER_THRESHOLD) * np.uint16(PINKY_RAISED)
+    mask |= (pinky_dy > FINGER_THRESHOLD) * np.uint16(PINKY_LOWERED)
+    mask |= (tips_to_palm.mean(axis=-1) < FIST_THRESHOLD) * np.uint16(FIST)
+    mask |= (pinch < PINCH_THRESHOLD) * np.uint16(PINCH)
+    mask |= (thumb_dx < 0) * np.uint16(THUMB_POINTS_LEFT)
+    mask |= (x[..., THUMB_TIP] < x[..., PINKY_BASE]) * np.uint16(RIGHT_HAND)
+    return mask
+
+
+def _gesture_for_mask(mask):
+    """Reference rule chain, evaluated once per mask to fill the lookup table"""
+    thumb = bool(mask & THUMB_EXTENDED)
+    index = bool(mask & INDEX_RAISED)
+    middle = bool(mask & MIDDLE_RAISED)
+    pinky_up = bool(mask & PINKY_RAISED)
+    pinky_down = bool(mask & PINKY_LOWERED)
+
+    # Hand closed (fist) - STOP
+    if mask & FIST:
+        return "STOP"
+    # Thumb and index extended, others closed - FORWARD
+    if thumb and index and not middle and not pinky_up:
+        return "FORWARD"
+    # Thumb and pinky extended, others closed - CIRCLE
+    if thumb and (pinky_up or pinky_down) and not index and not middle:
+        return "CIRCLE"
+    # Thumb only - direction follows where the thumb points
+    if thumb and not index and not middle and not pinky_up:
+        return "RIGHT" if mask & THUMB_POINTS_LEFT else "LEFT"
+    # Only index finger up - UP
+    if index and not middle and not pinky_up and not thumb:
+        return "UP"
+    # Index and middle fingers up - DOWN
+    if index and middle and not pinky_up and not thumb:
+        return "DOWN"
+    # Only pinky raised - right hand pinky = LEFT, left hand pinky = RIGHT
+    if pinky_up and not index and not middle and not thumb:
+        return "LEFT" if mask & RIGHT_HAND else "RIGHT"
+    # Thumb and index finger pinch with other fingers down - BACKWARD
+    if mask & PINCH and not middle and not pinky_up:
+        return "BACKWARD"
+    return None
+
+
+GESTURE_TABLE = np.array(
+    [GESTURE_CODES[_gesture_for_mask(mask)] for mask in range(1 << NUM_STATE_BITS)],
+    dtype=np.uint8
+)
+
+
+def classify_points(points):
+    """Map (..., 21, 3) landmarks to gesture codes through the lookup table"""
+    return GESTURE_TABLE[finger_state_masks(points)]
+
+
+def gesture_names(codes):
+    """Convert gesture codes back to names (None for no gesture)"""
+    return [GESTURES[code] for code in np.ravel(codes)]
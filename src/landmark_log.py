@@ -0,0 +1,67 @@
+import time
+import numpy as np
+
+MAX_HANDS = 2
+
+# Handedness codes use MediaPipe's camera labels, -1 marks an empty hand slot
+NO_HAND = -1
+HANDEDNESS_CODES = {"Left": 0, "Right": 1}
+
+# One fixed-size record per camera frame
+LOG_DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('handedness', np.int8, (MAX_HANDS,)),
+    ('landmarks', np.float32, (MAX_HANDS, 21, 3)),
+])
+
+
+class LandmarkRecorder:
+    """Collects per-frame hand landmarks and writes them as a .npy log"""
+    def __init__(self, path, capacity=1024):
+        self.path = path
+        self._records = np.zeros(capacity, dtype=LOG_DTYPE)
+        self._records['handedness'] = NO_HAND
+        self.count = 0
+
+    def append(self, points, handedness, timestamp=None):
+        """Record one frame, points is (hands, 21, 3) and handedness a list of labels"""
+        if self.count == len(self._records):
+            grown = np.zeros(2 * len(self._records), dtype=LOG_DTYPE)
+            grown['handedness'] = NO_HAND
+            grown[:self.count] = self._records
+            self._records = grown
+
+        record = self._records[self.count]
+        record['timestamp'] = time.perf_counter() if timestamp is None else timestamp
+        hands = min(len(handedness), MAX_HANDS)
+        if hands:
+            record['landmarks'][:hands] = points[:hands]
+            record['handedness'][:hands] = [HANDEDNESS_CODES[label] for label in handedness[:hands]]
+        self.count += 1
+
+    def close(self):
+        np.save(self.path, self._records[:self.count])
+        print(f"Saved {self.count} frames of landmarks to {self.path}")
+
+
+def load_landmark_log(path):
+    """Memory-map a recorded landmark log"""
+    log = np.load(path, mmap_mode='r')
+    if log.dtype != LOG_DTYPE:
+        raise ValueError(f"{path} is not a landmark log (dtype {log.dtype})")
+    return log
+
+
+def log_gesture_codes(codes, handedness):
+    """Split per-slot gesture codes into (left, right) hand codes per frame
+
+    Mirrors HandTracker.detect_gestures: the camera's "Right" hand is the
+    operator's left hand and drives the first drone.
+    """
+    left = np.zeros(codes.shape[:-1], dtype=codes.dtype)
+    right = np.zeros(codes.shape[:-1], dtype=codes.dtype)
+    # Later slots win, as later hands overwrite earlier ones in detect_gestures
+    for slot in range(codes.shape[-1]):
+        left = np.where(handedness[..., slot] == HANDEDNESS_CODES["Right"], codes[..., slot], left)
+        right = np.where(handedness[..., slot] == HANDEDNESS_CODES["Left"], codes[..., slot], right)
+    return left, right
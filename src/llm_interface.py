@@ -1,27 +1,145 @@
-import google.generativeai as genai
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from telemetry import telemetry
 
-class LLMInterface:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        
-    def process_question(self, question):
-        try:
-            # Add explicit instruction to get yes/no answer
-            prompt = f"""
-            Please answer the following question with ONLY 'yes' or 'no'. 
+PROMPT_TEMPLATE = """
+            Please answer the following question with ONLY 'yes' or 'no'.
             No other words or explanations.
             Question: {question}
             """
-            
-            response = self.model.generate_content(prompt)
-            answer = response.text.strip().lower()
-            
+
+class GeminiBackend:
+    """Google Gemini text generation"""
+    def __init__(self, api_key, model_name='gemini-1.5-flash'):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout=None):
+        request_options = {"timeout": timeout} if timeout else None
+        response = self.model.generate_content(prompt, request_options=request_options)
+        return response.text
+
+class StubBackend:
+    """Deterministic offline backend, answers yes/no from a hash of the prompt"""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency if timeout is None else min(self.latency, timeout))
+        return "yes" if zlib.crc32(prompt.encode()) % 2 == 0 else "no"
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire ttl seconds after insertion"""
+    def __init__(self, maxsize=256, ttl=600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace for cache keys
+
+    Arithmetic operators and decimal points are kept, so "5 - 3" and
+    "5 + 3" stay different questions; operators are spaced out so "5-3"
+    and "5 - 3" share a key.
+    """
+    text = re.sub(r"[^\w\s+\-*/=<>.]|\.(?!\d)", " ", question.lower())
+    return " ".join(re.sub(r"([+\-*/=<>])", r" \1 ", text).split())
+
+class LLMInterface:
+    def __init__(self, api_key=None, backend=None, timeout=10.0, cache_size=256, cache_ttl=600.0,
+                 max_workers=4):
+        self.backend = backend if backend is not None else GeminiBackend(api_key)
+        self.timeout = timeout
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def process_question(self, question):
+        """Blocking yes/no answer, None on error or timeout"""
+        try:
+            return self.process_question_async(question).result(timeout=self.timeout)
+        except TimeoutError:
+            print(f"No answer to question within {self.timeout} s")
+            return None
+        except Exception as e:
+            print(f"Error processing question: {e}")
+            return None
+
+    def process_question_async(self, question, callback=None):
+        """Return a Future for the yes/no answer, callback(answer) runs when it resolves"""
+        key = normalize_question(question)
+        answer = self.cache.get(key)
+        with self._lock:
+            if answer is not None:
+                self.cache_hits += 1
+                future = Future()
+                future.set_result(answer)
+            elif key in self._pending:
+                # Identical question already in flight, share its result
+                self.cache_hits += 1
+                future = self._pending[key]
+            else:
+                self.cache_misses += 1
+                future = self._executor.submit(self._answer, key, question)
+                self._pending[key] = future
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+
+    def _answer(self, key, question):
+        try:
+            prompt = PROMPT_TEMPLATE.format(question=question)
+            with telemetry.stage("process_question"):
+                answer = self.backend.generate(prompt, timeout=self.timeout).strip().lower()
+
             # Only accept 'yes' or 'no' answers
             if answer in ['yes', 'no']:
+                self.cache.put(key, answer)
                 return answer
             return None
-            
+
         except Exception as e:
             print(f"Error processing question: {e}")
-            return None 
\ No newline at end of file
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -1,118 +1,144 @@
-import cv2
-from hand_tracking import HandTracker
-from simulator import DroneSimulator
-from voice_processor import VoiceProcessor
-from llm_interface import LLMInterface
-import time
-
-def init_camera(index):
-    """Initialize camera with specific index"""
-    print(f"Attempting to initialize camera {index}...")
-    
-    # Try MacOS specific backend first
-    cap = cv2.VideoCapture(index + cv2.CAP_AVFOUNDATION)
-    
-    if not cap.isOpened():
-        print(f"Failed with AVFOUNDATION, trying default for camera {index}...")
-        cap = cv2.VideoCapture(index)
-    
-    if cap.isOpened():
-        # Set camera properties
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        print(f"Successfully opened camera {index}")
-        return cap
-    
-    print(f"Could not initialize camera {index}")
-    return None
+from startup import StartupProfiler, LazySubsystem
+STARTUP = StartupProfiler()
+
+# Only what the first frame needs is imported up front, voice and LLM load lazily
+with STARTUP.step("import cv2"):
+    import cv2
+with STARTUP.step("import hand_tracking (mediapipe)"):
+    from hand_tracking import HandTracker
+with STARTUP.step("import simulator (pygame, OpenGL)"):
+    from simulator import DroneSimulator, NO_COMMAND, oscillation_keyframes
+from camera import init_camera
+from landmark_log import LandmarkRecorder
+from multicam import MultiCameraCapture
+from collision import CollisionLayer
+from state_stream import StateStreamServer
+from telemetry import telemetry
+from pipeline import LatestSlot, CaptureThread, InferenceWorker, PipelineStats
+import argparse
+import queue
+import threading
+
+API_KEY = "API DAALDI GALTI SE HAHAHA"
+
+# StateStreamServer publishing poses to external processes, set by --stream
+STREAM = None
+
+def make_voice_processor():
+    from voice_processor import VoiceProcessor  # sounddevice, vosk and the model
+    return VoiceProcessor()
+
+def make_llm():
+    from llm_interface import LLMInterface  # google.generativeai
+    return LLMInterface(API_KEY)
 
 def nod_yes(simulator):
-    """Make drones nod up and down multiple times with large movements"""
-    original_speed = simulator.speed
-    simulator.speed = simulator.gesture_speed  # Use faster speed for gestures
-    
-    center_y = simulator.height / 2
-    for _ in range(3):  # 3 nods
-        # Move both drones way up
-        for _ in range(3):  # Multiple updates for larger movement
-            simulator.update(["UP", "UP"])
-            simulator.render()
-        time.sleep(0.4)  # Longer pause at top
-        
-        # Move both drones way down
-        for _ in range(6):  # Double the movement range down
-            simulator.update(["DOWN", "DOWN"])
-            simulator.render()
-        time.sleep(0.4)
-        
-        # Return to neutral position with smooth motion
-        for _ in range(3):
-            simulator.update(["UP", "UP"])
-            simulator.render()
-        time.sleep(0.3)
-    
-    simulator.speed = original_speed  # Restore original speed
+    """Queue three large up and down nods, played back by simulator.tick()"""
+    amplitude = 3 * simulator.gesture_speed
+    simulator.animate(oscillation_keyframes(axis=1, amplitude=amplitude))
 
 def shake_no(simulator):
-    """Make drones shake left and right multiple times with large movements"""
-    original_speed = simulator.speed
-    simulator.speed = simulator.gesture_speed  # Use faster speed for gestures
-    
-    for _ in range(3):  # 3 shakes
-        # Move both drones far left
-        for _ in range(3):  # Multiple updates for larger movement
-            simulator.update(["LEFT", "LEFT"])
-            simulator.render()
-        time.sleep(0.4)  # Longer pause at extremes
-        
-        # Move both drones far right
-        for _ in range(6):  # Double the movement range
-            simulator.update(["RIGHT", "RIGHT"])
-            simulator.render()
-        time.sleep(0.4)
-        
-        # Return to neutral position with smooth motion
-        for _ in range(3):
-            simulator.update(["LEFT", "LEFT"])
-            simulator.render()
-        time.sleep(0.3)
-    
-    simulator.speed = original_speed  # Restore original speed
+    """Queue three large left and right shakes, played back by simulator.tick()"""
+    amplitude = 3 * simulator.gesture_speed
+    simulator.animate(oscillation_keyframes(axis=0, amplitude=amplitude))
 
-def main():
-    # Initialize components
-    hand_tracker = HandTracker()
-    simulator = DroneSimulator()
-    voice_processor = VoiceProcessor()
-    llm = LLMInterface("API DAALDI GALTI SE HAHAHA")
+def end_frame(simulator):
+    """Per-frame bookkeeping after render: startup report, telemetry and HUD"""
+    STARTUP.first_frame()
+    telemetry.frame()
+    if simulator.hud_lines is not None:
+        simulator.hud_lines = telemetry.hud_lines()
+    if STREAM is not None:
+        with telemetry.stage("stream"):
+            STREAM.step()
+
+def apply_commands(simulator, commands):
+    """The frame's single simulator.update, with remote stream commands on top
+
+    commands are the local gestures, or None when local input produced
+    nothing this frame. Drones given a command by the newest remote packet
+    follow it; the rest follow their local gesture.
+    """
+    remote = STREAM.take_commands() if STREAM is not None else None
+    if remote is not None:
+        remote = simulator.command_codes(remote)
+        if commands is not None:
+            local = simulator.command_codes(commands).copy()
+            active = remote != NO_COMMAND
+            local[active] = remote[active]
+            remote = local
+        commands = remote
+    if commands is not None:
+        with telemetry.stage("update"):
+            simulator.update(commands)
+
+def start_voice_command(voice, llm, events):
+    """Listen on a background thread, the question lands in the events queue"""
+    print("\nListening for your question...")
+    llm.warm_up()  # Load the LLM client while the user is talking
     
-    # Start with camera 0
-    current_camera_index = 0
-    cap = init_camera(current_camera_index)
-    
-    print("\nCamera Controls:")
-    print("'1' - Switch to camera 0")
-    print("'2' - Switch to camera 1")
-    print("'3' - Switch to camera 2")
-    print("'v' - Voice command")
-    print("'q' - Quit")
+    def listen():
+        voice_processor = voice.get()  # Loads the Vosk model on first use
+        text = None
+        if voice_processor is not None:
+            text = voice_processor.listen(on_partial=lambda partial: print(f"... {partial}"))
+        events.put(('question', text))
     
+    thread = threading.Thread(target=listen, daemon=True)
+    thread.start()
+    return thread
+
+def poll_voice_command(events, llm, simulator):
+    """Send finished questions to the LLM and answer by nodding or shaking the drones"""
+    try:
+        kind, text = events.get_nowait()
+    except queue.Empty:
+        return
+    if kind == 'question' and text:
+        llm_interface = llm.get()
+        if llm_interface is None:
+            return
+        print(f"You asked: {text}")
+        print("Processing with LLM...")
+        llm_interface.process_question_async(text, callback=lambda answer: events.put(('answer', answer)))
+    elif kind == 'answer':
+        print(f"Response: {text}")
+        
+        if text == 'yes':
+            print("Nodding yes...")
+            nod_yes(simulator)
+        elif text == 'no':
+            print("Shaking no...")
+            shake_no(simulator)
+
+def run_serial(hand_tracker, simulator, voice, llm, cap, current_camera_index):
+    """Capture, track, simulate and render one after another on one thread"""
+    events = queue.Queue()
+    voice_thread = None
     while True:
+        commands = None
         if cap is not None:
-            ret, frame = cap.read()
+            with telemetry.stage("cap.read"):
+                ret, frame = cap.read()
             if ret:
-                frame, left_gesture, right_gesture = hand_tracker.detect_gestures(frame)
-                simulator.update([left_gesture, right_gesture])
+                with telemetry.stage("detect_gestures"):
+                    frame, left_gesture, right_gesture = hand_tracker.detect_gestures(frame)
+                commands = [left_gesture, right_gesture]
                 cv2.imshow('Hand Tracking', frame)
         else:
-            simulator.update([None, None])
+            commands = [None, None]
+        apply_commands(simulator, commands)
+        poll_voice_command(events, llm, simulator)
+        simulator.tick()
         
         # Process GLUT events and render
         try:
-            simulator.render()
+            with telemetry.stage("render"):
+                simulator.render()
         except Exception as e:
             print(f"Render error: {e}")
             break
+        end_frame(simulator)
             
         key = cv2.waitKey(1) & 0xFF
         
@@ -131,20 +157,8 @@ def main():
         
         # Voice command
         elif key == ord('v'):
-            print("\nListening for your question...")
-            question = voice_processor.listen()
-            if question:
-                print(f"You asked: {question}")
-                print("Processing with LLM...")
-                response = llm.process_question(question)
-                print(f"Response: {response}")
-                
-                if response == 'yes':
-                    print("Nodding yes...")
-                    nod_yes(simulator)
-                elif response == 'no':
-                    print("Shaking no...")
-                    shake_no(simulator)
+            if voice_thread is None or not voice_thread.is_alive():
+                voice_thread = start_voice_command(voice, llm, events)
         
         # Quit
         elif key == ord('q'):
@@ -152,6 +166,274 @@ def main():
     
     if cap is not None:
         cap.release()
+
+def run_pipelined(hand_tracker, simulator, voice, llm, cap, current_camera_index,
+                  max_gesture_age=0.25):
+    """Capture and hand tracking run on worker threads, the render loop never waits on them"""
+    frame_slot = LatestSlot()
+    result_slot = LatestSlot()
+    capture = CaptureThread(cap, frame_slot)
+    worker = InferenceWorker(hand_tracker, frame_slot, result_slot)
+    stats = PipelineStats()
+    capture.start()
+    worker.start()
+    
+    events = queue.Queue()
+    voice_thread = None
+    result_seq = 0
+    while True:
+        # Apply each gesture result exactly once, as the serial loop does per camera frame
+        commands = None
+        seq, result = result_slot.peek()
+        if seq != result_seq and result is not None:
+            result_seq = seq
+            age = result.age()
+            stats.record_result(age)
+            # Gestures older than max_gesture_age are ignored so a stalled
+            # inference never keeps the drones flying on an old command
+            if age <= max_gesture_age:
+                commands = [result.left, result.right]
+            cv2.putText(result.frame, f"age {age * 1000:.0f} ms", (10, 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.imshow('Hand Tracking', result.frame)
+        apply_commands(simulator, commands)
+        poll_voice_command(events, llm, simulator)
+        simulator.tick()
+        
+        try:
+            with telemetry.stage("render"):
+                simulator.render()
+        except Exception as e:
+            print(f"Render error: {e}")
+            break
+        end_frame(simulator)
+        stats.record_render()
+        
+        report = stats.maybe_report(capture, worker, frame_slot)
+        if report:
+            print(report)
+        
+        key = cv2.waitKey(1) & 0xFF
+        
+        # Camera switching controls
+        if key in [ord('1'), ord('2'), ord('3')]:
+            new_index = int(chr(key)) - 1  # Convert '1','2','3' to 0,1,2
+            if new_index != current_camera_index:
+                print(f"\nSwitching to camera {new_index}")
+                new_cap = init_camera(new_index)
+                if new_cap is None:
+                    print(f"Failed to switch to camera {new_index}, keeping camera {current_camera_index}")
+                else:
+                    capture.set_capture(new_cap)
+                    current_camera_index = new_index
+        
+        # Voice command
+        elif key == ord('v'):
+            if voice_thread is None or not voice_thread.is_alive():
+                voice_thread = start_voice_command(voice, llm, events)
+        
+        # Quit
+        elif key == ord('q'):
+            break
+    
+    capture.stop()
+    worker.stop()
+    capture.join(timeout=1.0)
+    worker.join(timeout=1.0)
+    capture.set_capture(None)
+
+def run_multicam(multicam, simulator, voice, llm, mode='split', max_gesture_age=0.25):
+    """All cameras stay open in worker processes, switching only changes the preview
+
+    In 'split' mode every camera drives its own pair of drone groups (one
+    operator per camera), in 'active' mode only the previewed camera does.
+    """
+    events = queue.Queue()
+    voice_thread = None
+    active = 0
+    shown_seq = 0
+    while True:
+        gestures = multicam.new_gestures(max_gesture_age)
+        if mode == 'split':
+            commands = [gesture for pair in gestures for gesture in pair]
+        else:
+            commands = list(gestures[active])
+        if not any(command is not None for command in commands):
+            commands = None
+        apply_commands(simulator, commands)
+        
+        seq, frame, captured_at = multicam.latest_frame(active)
+        if frame is not None and seq != shown_seq:
+            shown_seq = seq
+            cv2.imshow('Hand Tracking', frame)
+        poll_voice_command(events, llm, simulator)
+        simulator.tick()
+        
+        try:
+            with telemetry.stage("render"):
+                simulator.render()
+        except Exception as e:
+            print(f"Render error: {e}")
+            break
+        end_frame(simulator)
+        
+        key = cv2.waitKey(1) & 0xFF
+        
+        # Camera switching is instant, every camera is already running
+        if ord('1') <= key <= ord('9'):
+            new_active = key - ord('1')
+            if new_active < len(multicam.indices) and new_active != active:
+                active = new_active
+                shown_seq = 0
+                print(f"\nShowing camera {multicam.indices[active]}")
+        
+        # Voice command
+        elif key == ord('v'):
+            if voice_thread is None or not voice_thread.is_alive():
+                voice_thread = start_voice_command(voice, llm, events)
+        
+        # Quit
+        elif key == ord('q'):
+            break
+
+def configure_simulator(simulator, args):
+    """Optional simulator layers selected on the command line"""
+    global STREAM
+    if args.hud:
+        simulator.hud_lines = []
+    if args.separation:
+        simulator.collision = CollisionLayer(args.separation)
+    if args.stream:
+        try:
+            STREAM = StateStreamServer(simulator, args.stream)
+            print(f"Streaming drone poses on {STREAM.address}")
+        except OSError as e:
+            print(f"Error starting the state stream: {e}")
+
+def report_simulator(simulator):
+    if simulator.collision is not None:
+        print(simulator.collision.report())
+    if STREAM is not None:
+        print(f"stream: {STREAM.published} snapshots published, "
+              f"{STREAM.commands_applied} of {STREAM.commands_received} command packets applied, "
+              f"{STREAM.commands_rejected} malformed")
+        STREAM.close()
+
+def run_single_camera_session(args, tracker_options, voice, llm):
+    # Initialize components
+    with STARTUP.step("HandTracker()"):
+        hand_tracker = HandTracker(**tracker_options)
+    with STARTUP.step("DroneSimulator()"):
+        simulator = DroneSimulator(num_drones=args.drones)
+    configure_simulator(simulator, args)
+    if args.record:
+        hand_tracker.recorder = LandmarkRecorder(args.record)
+    
+    # Start with camera 0
+    current_camera_index = 0
+    with STARTUP.step("init_camera()"):
+        cap = init_camera(current_camera_index)
+    
+    print("\nCamera Controls:")
+    print("'1' - Switch to camera 0")
+    print("'2' - Switch to camera 1")
+    print("'3' - Switch to camera 2")
+    print("'v' - Voice command")
+    print("'q' - Quit")
+    
+    if args.pipelined:
+        run_pipelined(hand_tracker, simulator, voice, llm, cap, current_camera_index,
+                      max_gesture_age=args.max_gesture_age)
+    else:
+        run_serial(hand_tracker, simulator, voice, llm, cap, current_camera_index)
+    if hand_tracker.recorder is not None:
+        hand_tracker.recorder.close()
+    report_simulator(simulator)
+
+def run_multicam_session(args, tracker_options, voice, llm):
+    num_cameras = len(args.cameras)
+    with STARTUP.step("MultiCameraCapture()"):
+        multicam = MultiCameraCapture(args.cameras, tracker_options=tracker_options)
+    with STARTUP.step("DroneSimulator()"):
+        if args.camera_mode == 'split':
+            simulator = DroneSimulator(num_drones=max(args.drones, 2 * num_cameras),
+                                       num_controllers=2 * num_cameras)
+        else:
+            simulator = DroneSimulator(num_drones=args.drones)
+    configure_simulator(simulator, args)
+    
+    print("\nCamera Controls:")
+    for position, index in enumerate(args.cameras):
+        print(f"'{position + 1}' - Show camera {index}")
+    print("'v' - Voice command")
+    print("'q' - Quit")
+    
+    try:
+        run_multicam(multicam, simulator, voice, llm, args.camera_mode, args.max_gesture_age)
+    finally:
+        multicam.close()
+    report_simulator(simulator)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gesture controlled drone simulator")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture and hand tracking on worker threads")
+    parser.add_argument("--max-gesture-age", type=float, default=0.25,
+                        help="seconds after capture a gesture is still applied (pipelined and multi-camera)")
+    parser.add_argument("--drones", type=int, default=2,
+                        help="number of drones, split between the left and right hand")
+    parser.add_argument("--separation", type=float,
+                        help="minimum distance between drones, enables collision avoidance")
+    parser.add_argument("--inference-scale", type=float, default=1.0,
+                        help="run hand tracking on a frame downscaled by this factor")
+    parser.add_argument("--skip-stable", type=float, default=0.0, metavar="THRESHOLD",
+                        help="reuse the last gestures while landmarks move less than this")
+    parser.add_argument("--max-skip", type=int, default=2,
+                        help="most consecutive frames skipped by --skip-stable")
+    parser.add_argument("--no-overlay", action="store_true",
+                        help="do not draw hand landmarks on the camera preview")
+    parser.add_argument("--cameras", type=lambda value: [int(i) for i in value.split(',')],
+                        metavar="0,1,...", help="keep these cameras open, each tracked in its own process")
+    parser.add_argument("--camera-mode", choices=["split", "active"], default="split",
+                        help="with --cameras: one drone pair per camera, or only the shown camera drives")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="collect per-stage timings and append JSON-lines snapshots to PATH")
+    parser.add_argument("--telemetry-interval", type=float, default=5.0,
+                        help="seconds between telemetry snapshots")
+    parser.add_argument("--hud", action="store_true",
+                        help="show per-stage timings in the simulator window")
+    parser.add_argument("--stream", metavar="ADDRESS",
+                        help="publish poses and accept commands on a UDP host:port or Unix socket path")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="load voice recognition and the LLM in the background at startup")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record hand landmarks to a .npy log for benchmark.py")
+    args = parser.parse_args()
+    if args.cameras and args.pipelined:
+        parser.error("--pipelined has no effect with --cameras, every camera is already tracked in its own process")
+    if args.cameras and args.record:
+        parser.error("--record is not supported with --cameras, record one camera at a time")
+    if args.telemetry or args.hud:
+        telemetry.configure(path=args.telemetry, flush_interval=args.telemetry_interval)
+    
+    tracker_options = dict(
+        inference_scale=args.inference_scale,
+        stability_threshold=args.skip_stable,
+        max_skip_frames=args.max_skip if args.skip_stable > 0 else 0,
+        draw_overlay=not args.no_overlay
+    )
+    voice = LazySubsystem("VoiceProcessor()", make_voice_processor, STARTUP)
+    llm = LazySubsystem("LLMInterface()", make_llm, STARTUP)
+    if args.warm_up:
+        voice.warm_up()
+        llm.warm_up()
+    
+    if args.cameras:
+        run_multicam_session(args, tracker_options, voice, llm)
+    else:
+        run_single_camera_session(args, tracker_options, voice, llm)
+    if llm.loaded:
+        llm.get().close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+"""Parallel model comparison over one cached, memory-mapped feature matrix
+
+The engineered features are built once per (CSV contents, feature config) and
+stored as .npy files in the cache directory, with the rows shuffled once on
+the way in. Train and validation sets are then contiguous row ranges, so
+every candidate slices them straight out of the memory-mapped file and
+worker processes share the page cache instead of copying the matrix.
+
+Usage:
+    python model_harness.py train.csv
+    python model_harness.py train.csv --specs specs.json --workers 4 --threads 2 --json leaderboard.json
+
+A specs file is a JSON list of
+    {"name": "rf", "estimator": "sklearn.ensemble.RandomForestRegressor",
+     "params": {"n_estimators": 300}, "grid": {"max_depth": [10, 20]}}
+"""
+import argparse
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from numpy.lib.format import open_memmap
+from sklearn.metrics import r2_score
+from csv_utils import count_rows
+from flood_features import iter_csv_features
+
+# Bump when flood_features changes what it produces, to invalidate old caches
+FEATURE_VERSION = 1
+CACHE_DIR = '.feature_cache'
+
+# The ensemble from here_we_go_again.ipynb
+DEFAULT_SPECS = [
+    {'name': 'xgb', 'estimator': 'xgboost.XGBRegressor',
+     'params': {'n_estimators': 2000, 'learning_rate': 0.005, 'max_depth': 8,
+                'subsample': 0.8, 'colsample_bytree': 0.8, 'random_state': 42}},
+    {'name': 'gbm', 'estimator': 'sklearn.ensemble.GradientBoostingRegressor',
+     'params': {'n_estimators': 1000, 'learning_rate': 0.005, 'max_depth': 7, 'random_state': 42}},
+    {'name': 'rf', 'estimator': 'sklearn.ensemble.RandomForestRegressor',
+     'params': {'n_estimators': 1000, 'max_depth': 20, 'min_samples_split': 5, 'random_state': 42}},
+]
+
+
+def cache_key(csv_path, config):
+    """sha256 over the CSV bytes and the feature config"""
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(json.dumps(dict(config, version=FEATURE_VERSION), sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def build_feature_cache(csv_path, cache_dir=CACHE_DIR, chunksize=65536, seed=0):
+    """Return paths of the cached features/target .npy files, building them if needed
+
+    Rows are stored in a random order fixed by seed, so any contiguous
+    range of the cache is a random sample of the CSV.
+    """
+    key = cache_key(csv_path, {'features': 'flood_features', 'shuffle_seed': seed})
+    paths = {part: os.path.join(cache_dir, f"{key}.{part}.npy") for part in ('features', 'target')}
+    if all(os.path.exists(path) for path in paths.values()):
+        print(f"Using cached features {paths['features']}")
+        return paths
+
+    os.makedirs(cache_dir, exist_ok=True)
+    start = time.perf_counter()
+    rows = count_rows(csv_path)
+    if rows == 0:
+        raise ValueError(f"{csv_path} has no data rows")
+    order = np.random.default_rng(seed).permutation(rows)
+    features = target = None
+    written = 0
+    # Write under temporary names so an interrupted build never looks complete
+    tmp = {part: path + '.tmp' for part, path in paths.items()}
+    try:
+        for _, chunk_features, chunk_target in iter_csv_features(csv_path, chunksize):
+            if written + len(chunk_features) > rows:
+                raise ValueError(f"{csv_path} has more rows than the {rows} counted, file changed?")
+            if features is None:
+                features = open_memmap(tmp['features'], mode='w+', dtype=np.float32,
+                                       shape=(rows, chunk_features.shape[1]))
+                target = open_memmap(tmp['target'], mode='w+', dtype=np.float32, shape=(rows,))
+            positions = order[written:written + len(chunk_features)]
+            features[positions] = chunk_features
+            target[positions] = chunk_target
+            written += len(chunk_features)
+        # Unwritten rows would be all-zero samples shuffled into train or valid
+        if written != rows:
+            raise ValueError(f"{csv_path} has {written} rows but {rows} were counted, file changed?")
+        columns = features.shape[1]
+        features.flush()
+        target.flush()
+    except BaseException:
+        del features, target
+        for path in tmp.values():
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    del features, target
+    for part in paths:
+        os.replace(tmp[part], paths[part])
+    print(f"Built {rows} x {columns} features in {time.perf_counter() - start:.1f} s -> {paths['features']}")
+    return paths
+
+
+def expand_specs(specs):
+    """One candidate per point of every spec's hyperparameter grid"""
+    candidates = []
+    for spec in specs:
+        grid = spec.get('grid', {})
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            params = dict(spec.get('params', {}), **dict(zip(keys, values)))
+            label = spec['name'] + ''.join(f" {key}={value}" for key, value in zip(keys, values))
+            candidates.append({'name': label, 'estimator': spec['estimator'], 'params': params})
+    return candidates
+
+
+def _make_estimator(dotted_path, params, threads):
+    module_name, class_name = dotted_path.rsplit('.', 1)
+    estimator = getattr(importlib.import_module(module_name), class_name)(**params)
+    # Estimators with their own thread pool get exactly the worker's budget
+    if 'n_jobs' in estimator.get_params() and 'n_jobs' not in params:
+        estimator.set_params(n_jobs=threads)
+    return estimator
+
+
+def evaluate_candidate(candidate, paths, train_rows, valid_rows, threads):
+    """Fit one candidate in a worker process, returns its leaderboard row
+
+    train_rows and valid_rows are (start, stop) ranges of the shuffled cache;
+    slicing them keeps memmap views, so no worker holds a private copy.
+    """
+    from threadpoolctl import threadpool_limits
+
+    features = np.load(paths['features'], mmap_mode='r')
+    target = np.load(paths['target'], mmap_mode='r')
+    train, valid = slice(*train_rows), slice(*valid_rows)
+    row = {'name': candidate['name']}
+    try:
+        with threadpool_limits(limits=threads):
+            estimator = _make_estimator(candidate['estimator'], candidate['params'], threads)
+            X_train, y_train = features[train], target[train]
+            start = time.perf_counter()
+            estimator.fit(X_train, y_train)
+            row['fit_s'] = time.perf_counter() - start
+            del X_train, y_train
+
+            X_valid = features[valid]
+            start = time.perf_counter()
+            predictions = estimator.predict(X_valid)
+            predict_s = time.perf_counter() - start
+        row['r2'] = float(r2_score(target[valid], predictions))
+        row['predict_rows_per_s'] = len(X_valid) / predict_s if predict_s > 0 else float('inf')
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def compare_models(csv_path, specs=DEFAULT_SPECS, workers=2, threads=1, valid_fraction=0.2,
+                   sample=None, seed=0, cache_dir=CACHE_DIR):
+    """Evaluate every candidate concurrently and return the sorted leaderboard"""
+    paths = build_feature_cache(csv_path, cache_dir, seed=seed)
+    rows = len(np.load(paths['target'], mmap_mode='r'))
+    # The cache is already shuffled, so a sample and the split are plain prefixes
+    used = rows if sample is None else min(sample, rows)
+    split = int(used * (1 - valid_fraction))
+
+    candidates = expand_specs(specs)
+    print(f"Evaluating {len(candidates)} candidates on {workers} workers x {threads} threads")
+    leaderboard = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_candidate, candidate, paths, (0, split), (split, used), threads)
+                   for candidate in candidates]
+        for future in as_completed(futures):
+            row = future.result()
+            status = row['error'] if 'error' in row else f"R² {row['r2']:.4f}"
+            print(f"  {row['name']}: {status}")
+            leaderboard.append(row)
+    leaderboard.sort(key=lambda row: row.get('r2', float('-inf')), reverse=True)
+    return leaderboard
+
+
+def print_leaderboard(leaderboard):
+    print(f"\n{'model':40s} {'R²':>8s} {'fit s':>9s} {'predict rows/s':>15s}")
+    for row in leaderboard:
+        if 'error' in row:
+            print(f"{row['name']:40s} {row['error']}")
+        else:
+            print(f"{row['name']:40s} {row['r2']:8.4f} {row['fit_s']:9.2f} {row['predict_rows_per_s']:15,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("train", help="training CSV with a flood_probability column")
+    parser.add_argument("--specs", help="JSON file of model specs (default: the notebook ensemble)")
+    parser.add_argument("--workers", type=int, default=2, help="candidates evaluated concurrently")
+    parser.add_argument("--threads", type=int, default=1, help="BLAS/OpenMP/n_jobs threads per worker")
+    parser.add_argument("--valid-fraction", type=float, default=0.2)
+    parser.add_argument("--sample", type=int, help="use a random subset of this many rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--json", metavar="PATH", help="write the leaderboard as JSON")
+    args = parser.parse_args()
+
+    specs = DEFAULT_SPECS
+    if args.specs:
+        with open(args.specs) as f:
+            specs = json.load(f)
+    leaderboard = compare_models(args.train, specs, args.workers, args.threads, args.valid_fraction,
+                                 args.sample, args.seed, args.cache_dir)
+    print_leaderboard(leaderboard)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(leaderboard, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from gestures import GESTURES, GESTURE_CODES
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+class FrameRing:
+    """Shared-memory ring of camera frames plus the latest gesture pair
+
+    Layout of the block: an int64 header [latest_seq, packed_gestures,
+    slot_seq * slots], float64 capture times per slot, then the frames.
+    Each slot is guarded by its sequence number (-1 while being written),
+    so readers detect and retry torn reads without any locks or pickling.
+    """
+    HEADER = 2
+
+    def __init__(self, name=None, slots=3, frame_shape=FRAME_SHAPE, create=False):
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        header_bytes = 8 * (self.HEADER + slots)
+        times_bytes = 8 * slots
+        frame_bytes = int(np.prod(self.frame_shape))
+        size = header_bytes + times_bytes + slots * frame_bytes
+
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self._owner = create
+        buf = self.shm.buf
+        self.header = np.ndarray((self.HEADER + slots,), dtype=np.int64, buffer=buf)
+        self.times = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=header_bytes)
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8, buffer=buf,
+                                 offset=header_bytes + times_bytes)
+        if create:
+            self.header[:] = 0
+
+    def write(self, frame, captured_at):
+        seq = int(self.header[0]) + 1
+        slot = seq % self.slots
+        self.header[self.HEADER + slot] = -1
+        self.frames[slot] = frame
+        self.times[slot] = captured_at
+        self.header[self.HEADER + slot] = seq
+        self.header[0] = seq
+        return seq
+
+    def read(self, retries=3):
+        """Copy the newest frame, returns (seq, frame, captured_at) or (0, None, None)"""
+        for _ in range(retries):
+            seq = int(self.header[0])
+            if seq == 0:
+                break
+            slot = seq % self.slots
+            frame = self.frames[slot].copy()
+            captured_at = float(self.times[slot])
+            if self.header[self.HEADER + slot] == seq:
+                return seq, frame, captured_at
+        return 0, None, None
+
+    def capture_time(self, seq):
+        """Capture time of frame seq if it is still in the ring"""
+        slot = seq % self.slots
+        captured_at = float(self.times[slot])
+        return captured_at if self.header[self.HEADER + slot] == seq else None
+
+    def write_gestures(self, seq, left, right):
+        # One 8-byte store, so readers never see a half-updated pair
+        self.header[1] = (seq << 16) | (GESTURE_CODES[right] << 8) | GESTURE_CODES[left]
+
+    def read_gestures(self):
+        """Returns (frame seq, left gesture, right gesture)"""
+        packed = int(self.header[1])
+        return packed >> 16, GESTURES[packed & 0xFF], GESTURES[(packed >> 8) & 0xFF]
+
+    def close(self):
+        self.header = self.times = self.frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def camera_worker(index, ring_name, slots, frame_shape, stop_event, tracker_options):
+    """Capture and hand-track one camera in its own process"""
+    import cv2
+    from camera import init_camera
+    from hand_tracking import HandTracker
+
+    ring = FrameRing(ring_name, slots, frame_shape)
+    cap = init_camera(index)
+    if cap is None:
+        ring.close()
+        return
+    hand_tracker = HandTracker(**tracker_options)
+    height, width = frame_shape[:2]
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            captured_at = time.monotonic()
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height))
+            frame, left, right = hand_tracker.detect_gestures(frame)
+            seq = ring.write(frame, captured_at)
+            ring.write_gestures(seq, left, right)
+    finally:
+        cap.release()
+        ring.close()
+
+
+class MultiCameraCapture:
+    """Keeps several cameras open, each captured and tracked in its own process"""
+    def __init__(self, indices, slots=3, frame_shape=FRAME_SHAPE, tracker_options=None):
+        self.indices = list(indices)
+        self._stop_event = mp.Event()
+        self.rings = [FrameRing(slots=slots, frame_shape=frame_shape, create=True) for _ in self.indices]
+        self.processes = [
+            mp.Process(target=camera_worker, daemon=True,
+                       args=(index, ring.name, slots, frame_shape, self._stop_event, tracker_options or {}))
+            for index, ring in zip(self.indices, self.rings)
+        ]
+        self._last_gesture_seq = [0] * len(self.indices)
+        for process in self.processes:
+            process.start()
+
+    def latest_frame(self, camera):
+        """Newest (seq, frame, captured_at) from camera position `camera` in indices"""
+        return self.rings[camera].read()
+
+    def new_gestures(self, max_age=None):
+        """(left, right) per camera for results not seen before, (None, None) otherwise
+
+        Results captured more than max_age seconds ago are dropped as stale.
+        """
+        now = time.monotonic()
+        gestures = []
+        for camera, ring in enumerate(self.rings):
+            seq, left, right = ring.read_gestures()
+            if seq == self._last_gesture_seq[camera]:
+                gestures.append((None, None))
+                continue
+            self._last_gesture_seq[camera] = seq
+            captured_at = ring.capture_time(seq)
+            if max_age is not None and (captured_at is None or now - captured_at > max_age):
+                gestures.append((None, None))
+            else:
+                gestures.append((left, right))
+        return gestures
+
+    def close(self):
+        self._stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
@@ -0,0 +1,394 @@
+"""Precomputed, memory-mapped neighbor index for the movie recommender
+
+An offline build encodes movies.csv, clusters it and stores the top-K
+same-cluster neighbors of every movie, so a session can serve
+recommendations without refitting anything:
+
+    python neighbor_index.py build movies.csv movie_index --method kmeans --clusters 4
+    python neighbor_index.py query movie_index "Iron Man (2008)" "Avatar (2009)"
+    python neighbor_index.py add movie_index "New Movie (2025)" "Action|Sci-Fi"
+
+The index directory holds features/labels/neighbors/distances/centroids .npy
+files plus a titles .json, all suffixed with the index generation and listed
+in a versioned manifest.json. Saving writes a new generation next to the
+current one and then swaps only the manifest, so readers always see one
+consistent generation.
+"""
+import argparse
+import json
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 2
+ARRAYS = ('features', 'labels', 'neighbors', 'distances', 'centroids')
+NOISE = -1
+QUERY_CHUNK = 1024
+
+
+def encode_genres(genre_lists, genres):
+    """Binary (movies, genres) matrix for pipe-split genre lists"""
+    column = {genre: i for i, genre in enumerate(genres)}
+    encoded = np.zeros((len(genre_lists), len(genres)), dtype=np.float32)
+    for row, movie_genres in enumerate(genre_lists):
+        for genre in movie_genres:
+            if genre in column:
+                encoded[row, column[genre]] = 1
+    return encoded
+
+
+def load_movies(path):
+    """titles, genre lists and the sorted genre vocabulary of movies.csv"""
+    df = pd.read_csv(path)
+    genre_lists = [genres.split('|') for genres in df['genres']]
+    genres = sorted({genre for movie_genres in genre_lists for genre in movie_genres})
+    return df['title'].tolist(), genre_lists, genres
+
+
+def cluster_features(features, method, clusters=4, eps=0.15, min_samples=4, seed=1):
+    """Labels and the feature space they were fitted in, like the notebook cells"""
+    from sklearn.cluster import DBSCAN, AgglomerativeClustering, KMeans
+
+    scaling = None
+    if method == 'kmeans':
+        labels = KMeans(n_clusters=clusters, random_state=seed).fit_predict(features)
+    elif method == 'agglomerative':
+        labels = AgglomerativeClustering(n_clusters=clusters, metric='euclidean',
+                                         linkage='ward').fit_predict(features)
+    elif method == 'dbscan':
+        # DBSCAN ran on standardized features, so neighbors are measured there too
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        scaling = {'mean': mean.tolist(), 'scale': scale.tolist()}
+        features = ((features - mean) / scale).astype(np.float32)
+        labels = DBSCAN(eps=eps, min_samples=min_samples).fit_predict(features)
+    else:
+        raise ValueError(f"Unknown clustering method {method!r}")
+    return features, labels.astype(np.int32), scaling
+
+
+def _pairwise(a, b, b_sq_norms):
+    squared = np.einsum('ij,ij->i', a, a)[:, None] + b_sq_norms[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _top_k(distances, k):
+    """Column indices and values of the k smallest entries per row, sorted"""
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(k), (len(distances), 1))
+    values = np.take_along_axis(distances, part, axis=1)
+    order = np.argsort(values, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+
+def neighbor_table(features, labels, title_codes, top_k):
+    """Top-K same-cluster neighbors per movie, padded with -1 / inf"""
+    n = len(features)
+    neighbors = np.full((n, top_k), -1, dtype=np.int32)
+    distances = np.full((n, top_k), np.inf, dtype=np.float32)
+    features = features.astype(np.float64)
+    sq_norms = np.einsum('ij,ij->i', features, features)
+    for label in np.unique(labels):
+        if label == NOISE:
+            continue
+        members = np.flatnonzero(labels == label)
+        for start in range(0, len(members), QUERY_CHUNK):
+            queries = members[start:start + QUERY_CHUNK]
+            block = _pairwise(features[queries], features[members], sq_norms[members])
+            # A movie never recommends itself or another entry with its title
+            block[title_codes[queries][:, None] == title_codes[members][None, :]] = np.inf
+            columns, values = _top_k(block, top_k)
+            found = np.isfinite(values)
+            neighbors[queries, :columns.shape[1]] = np.where(found, members[columns], -1)
+            distances[queries, :columns.shape[1]] = values
+    return neighbors, distances
+
+
+def centroids_for(features, labels):
+    clusters = np.unique(labels[labels != NOISE])
+    centroids = np.zeros((len(clusters), features.shape[1]), dtype=np.float32)
+    for position, label in enumerate(clusters):
+        centroids[position] = features[labels == label].mean(axis=0)
+    return centroids, clusters
+
+
+def _current_generation(index_dir):
+    try:
+        with open(os.path.join(index_dir, 'manifest.json')) as f:
+            return json.load(f).get('generation', 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _write(path, write):
+    with open(path + '.tmp', 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def _save(index_dir, arrays, titles, manifest):
+    """Write a new generation of files, then swap in the manifest that points at them
+
+    Until the manifest is replaced, loaders keep reading the previous
+    generation, and a crash leaves it intact. The generation before that
+    is deleted afterwards; the previous one stays for loads in flight.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    generation = manifest['generation']
+    manifest['files'] = {}
+    for name in ARRAYS:
+        filename = f"{name}.g{generation}.npy"
+        _write(os.path.join(index_dir, filename), lambda f: np.save(f, arrays[name]))
+        manifest['files'][name] = {'path': filename, 'shape': list(arrays[name].shape),
+                                   'dtype': str(arrays[name].dtype)}
+    filename = f"titles.g{generation}.json"
+    _write(os.path.join(index_dir, filename), lambda f: f.write(json.dumps(titles).encode()))
+    manifest['files']['titles'] = {'path': filename, 'shape': [len(titles)]}
+    _write(os.path.join(index_dir, 'manifest.json'), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+    for filename in os.listdir(index_dir):
+        match = re.fullmatch(r'\w+\.g(\d+)\.(npy|json)', filename)
+        if match and int(match.group(1)) < generation - 1:
+            os.remove(os.path.join(index_dir, filename))
+
+
+def build_index(movies_path, index_dir, method='kmeans', clusters=4, eps=0.15, min_samples=4,
+                top_k=50, seed=1):
+    """Offline build: encode, cluster and precompute neighbors, then save"""
+    start = time.perf_counter()
+    titles, genre_lists, genres = load_movies(movies_path)
+    features, labels, scaling = cluster_features(encode_genres(genre_lists, genres), method,
+                                                 clusters, eps, min_samples, seed)
+    title_codes = pd.factorize(pd.Series(titles))[0]
+    neighbors, distances = neighbor_table(features, labels, title_codes, top_k)
+    centroids, centroid_labels = centroids_for(features, labels)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'generation': _current_generation(index_dir) + 1,
+        'created': time.time(),
+        'source': os.path.abspath(movies_path),
+        'method': method,
+        'params': {'clusters': clusters, 'eps': eps, 'min_samples': min_samples, 'seed': seed},
+        'top_k': top_k,
+        'movies': len(titles),
+        'genres': genres,
+        'scaling': scaling,
+        'centroid_labels': centroid_labels.tolist(),
+    }
+    arrays = {'features': features.astype(np.float32), 'labels': labels, 'neighbors': neighbors,
+              'distances': distances, 'centroids': centroids}
+    _save(index_dir, arrays, titles, manifest)
+    print(f"Built index of {len(titles)} movies ({method}, top {top_k}) in "
+          f"{time.perf_counter() - start:.1f} s -> {index_dir}")
+    return manifest
+
+
+class NeighborIndex:
+    """Serves recommendations straight from a built index directory"""
+    def __init__(self, index_dir, manifest, arrays, titles):
+        self.index_dir = index_dir
+        self.manifest = manifest
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.titles = titles
+        self.title_codes = pd.factorize(pd.Series(titles))[0]
+        self.index = {}
+        for row, title in enumerate(titles):
+            self.index.setdefault(title, row)
+
+    @classmethod
+    def load(cls, index_dir, mmap_mode='r', retries=3):
+        """Open the generation named by the manifest, checking every file against it"""
+        for attempt in range(retries):
+            with open(os.path.join(index_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+            if manifest.get('format_version') != FORMAT_VERSION:
+                raise ValueError(f"{index_dir} has index format {manifest.get('format_version')}, "
+                                 f"expected {FORMAT_VERSION}; rebuild it")
+            files = manifest['files']
+            try:
+                arrays = {name: np.load(os.path.join(index_dir, files[name]['path']), mmap_mode=mmap_mode)
+                          for name in ARRAYS}
+                with open(os.path.join(index_dir, files['titles']['path'])) as f:
+                    titles = json.load(f)
+            except FileNotFoundError:
+                # Two saves landed since the manifest was read, read the newer one
+                if attempt == retries - 1:
+                    raise
+                continue
+            break
+        for name in ARRAYS:
+            if list(arrays[name].shape) != files[name]['shape'] or str(arrays[name].dtype) != files[name]['dtype']:
+                raise ValueError(f"{files[name]['path']} is {arrays[name].dtype} {list(arrays[name].shape)}, "
+                                 f"manifest expects {files[name]['dtype']} {files[name]['shape']}")
+        if len(titles) != manifest['movies'] or len(arrays['features']) != manifest['movies']:
+            raise ValueError(f"{index_dir} has {len(titles)} titles and {len(arrays['features'])} rows, "
+                             f"manifest expects {manifest['movies']} movies")
+        return cls(index_dir, manifest, arrays, titles)
+
+    def _rows(self, titles):
+        rows = []
+        for title in titles:
+            row = self.index.get(title)
+            if row is None:
+                print(f"Movie '{title}' not found in the index.")
+            elif self.labels[row] == NOISE:
+                print(f"Movie '{title}' is considered noise by DBSCAN. Skipping.")
+            else:
+                rows.append(row)
+        return rows
+
+    def recommend(self, titles, top_n=5, mode='nearest'):
+        """DataFrame of recommendations served from the precomputed tables
+
+        'nearest' ranks by distance to the closest query movie. 'sum' re-ranks
+        the union of the query movies' neighbor lists by summed distance to
+        the query movies sharing each candidate's cluster.
+        """
+        rows = self._rows(titles)
+        if not rows:
+            return pd.DataFrame({'title': [], 'distance': []})
+        candidates = np.asarray(self.neighbors[rows])
+        if mode == 'nearest':
+            distances = np.asarray(self.distances[rows]).ravel()
+            candidates = candidates.ravel()
+            valid = candidates >= 0
+            pool = np.unique(candidates[valid])
+            best = np.full(len(pool), np.inf)
+            np.minimum.at(best, np.searchsorted(pool, candidates[valid]), distances[valid])
+            column = 'distance'
+        elif mode == 'sum':
+            pool = np.unique(candidates[candidates >= 0])
+            queries = np.asarray(self.features[rows], dtype=np.float64)
+            pool_features = np.asarray(self.features[pool], dtype=np.float64)
+            distances = _pairwise(queries, pool_features, np.einsum('ij,ij->i', pool_features, pool_features))
+            # Same rules as RecommendationEngine: a query only scores candidates
+            # in its own cluster, never entries with its own title
+            scored = ((self.labels[rows][:, None] == self.labels[pool][None, :])
+                      & (self.title_codes[rows][:, None] != self.title_codes[pool][None, :]))
+            best = np.where(scored, distances, 0.0).sum(axis=0)
+            column = 'total_distance' if len(titles) > 1 else 'distance'
+        else:
+            raise ValueError(f"Unknown mode {mode!r}, expected 'sum' or 'nearest'")
+        if len(pool) > top_n:
+            keep = np.argpartition(best, top_n - 1)[:top_n]
+            pool, best = pool[keep], best[keep]
+        order = np.argsort(best, kind='stable')
+        return pd.DataFrame({'title': [self.titles[row] for row in pool[order]], column: best[order]})
+
+    def add_movies(self, titles, genre_lists):
+        """Insert new movies without reclustering, and persist the index
+
+        Each new movie joins the cluster with the nearest centroid, gets its
+        own top-K list, and is spliced into the lists of existing members it
+        is closer to than their current K-th neighbor. Centroids are updated
+        as running means.
+        """
+        genres = self.manifest['genres']
+        new_features = encode_genres(genre_lists, genres)
+        unknown = {genre for movie_genres in genre_lists for genre in movie_genres} - set(genres)
+        if unknown:
+            print(f"Ignoring genres not in the index: {sorted(unknown)}")
+        scaling = self.manifest['scaling']
+        if scaling is not None:
+            new_features = ((new_features - np.array(scaling['mean'])) / np.array(scaling['scale'])).astype(np.float32)
+
+        features = np.concatenate([self.features, new_features])
+        all_titles = self.titles + list(titles)
+        centroids = np.array(self.centroids, dtype=np.float32)
+        centroid_labels = np.array(self.manifest['centroid_labels'], dtype=np.int32)
+        counts = np.array([np.count_nonzero(self.labels == label) for label in centroid_labels])
+        assigned = centroid_labels[np.argmin(_pairwise(new_features.astype(np.float64), centroids.astype(np.float64),
+                                                       np.einsum('ij,ij->i', centroids, centroids)), axis=1)]
+        labels = np.concatenate([self.labels, assigned]).astype(np.int32)
+
+        top_k = self.manifest['top_k']
+        neighbors = np.concatenate([self.neighbors, np.full((len(titles), top_k), -1, dtype=np.int32)])
+        distances = np.concatenate([self.distances, np.full((len(titles), top_k), np.inf, dtype=np.float32)])
+        title_codes = pd.factorize(pd.Series(all_titles))[0]
+        sq_norms = np.einsum('ij,ij->i', features.astype(np.float64), features.astype(np.float64))
+        first_new = len(self.titles)
+        for offset, label in enumerate(assigned):
+            row = first_new + offset
+            members = np.flatnonzero(labels[:row + 1] == label)
+            members = members[members != row]
+            member_distances = _pairwise(features[row:row + 1].astype(np.float64),
+                                         features[members].astype(np.float64), sq_norms[members])[0]
+            member_distances[title_codes[members] == title_codes[row]] = np.inf
+            columns, values = _top_k(member_distances[None, :], top_k)
+            found = np.isfinite(values[0])
+            neighbors[row, :columns.shape[1]] = np.where(found, members[columns[0]], -1)
+            distances[row, :columns.shape[1]] = values[0]
+
+            # Existing members whose K-th neighbor is farther than the new movie
+            closer = np.isfinite(member_distances) & (member_distances < distances[members, -1])
+            for member, distance in zip(members[closer], member_distances[closer]):
+                slot = np.searchsorted(distances[member], distance, side='right')
+                neighbors[member, slot + 1:] = neighbors[member, slot:-1].copy()
+                distances[member, slot + 1:] = distances[member, slot:-1].copy()
+                neighbors[member, slot] = row
+                distances[member, slot] = distance
+
+            position = np.flatnonzero(centroid_labels == label)[0]
+            counts[position] += 1
+            centroids[position] += (features[row] - centroids[position]) / counts[position]
+
+        generation = max(self.manifest['generation'], _current_generation(self.index_dir)) + 1
+        manifest = dict(self.manifest, generation=generation,
+                        movies=len(all_titles), updated=time.time())
+        arrays = {'features': features.astype(np.float32), 'labels': labels, 'neighbors': neighbors,
+                  'distances': distances, 'centroids': centroids}
+        _save(self.index_dir, arrays, all_titles, manifest)
+        reloaded = NeighborIndex.load(self.index_dir)
+        self.__dict__.update(reloaded.__dict__)
+        print(f"Added {len(titles)} movies, index generation {manifest['generation']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="encode, cluster and precompute neighbors")
+    build.add_argument("movies")
+    build.add_argument("index_dir")
+    build.add_argument("--method", choices=["kmeans", "dbscan", "agglomerative"], default="kmeans")
+    build.add_argument("--clusters", type=int, default=4)
+    build.add_argument("--eps", type=float, default=0.15)
+    build.add_argument("--min-samples", type=int, default=4)
+    build.add_argument("--top-k", type=int, default=50)
+
+    query = commands.add_parser("query", help="recommend movies similar to the given titles")
+    query.add_argument("index_dir")
+    query.add_argument("titles", nargs="+")
+    query.add_argument("--top-n", type=int, default=5)
+    query.add_argument("--mode", choices=["nearest", "sum"], default="nearest")
+
+    add = commands.add_parser("add", help="insert a movie into an existing index")
+    add.add_argument("index_dir")
+    add.add_argument("title")
+    add.add_argument("genres", help="pipe-separated, e.g. 'Action|Sci-Fi'")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.movies, args.index_dir, args.method, args.clusters, args.eps,
+                    args.min_samples, args.top_k)
+    elif args.command == "query":
+        start = time.perf_counter()
+        index = NeighborIndex.load(args.index_dir)
+        recommendations = index.recommend(args.titles, args.top_n, args.mode)
+        print(recommendations.to_string(index=False))
+        print(f"Served in {(time.perf_counter() - start) * 1000:.1f} ms including load")
+    else:
+        NeighborIndex.load(args.index_dir).add_movies([args.title], [args.genres.split('|')])
+
+
+if __name__ == "__main__":
+    main()
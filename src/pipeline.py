@@ -0,0 +1,154 @@
+import threading
+import time
+from telemetry import telemetry
+
+
+class LatestSlot:
+    """Thread-safe single-item slot that only keeps the newest value"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._read_seq = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            # Overwriting an item nobody read yet means that item was dropped
+            if self._seq > self._read_seq:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq=0, timeout=None):
+        """Block until an item newer than last_seq arrives, return (seq, item)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq, timeout):
+                return last_seq, None
+            self._read_seq = self._seq
+            return self._seq, self._item
+
+    def peek(self):
+        """Return the newest (seq, item) without blocking"""
+        with self._cond:
+            self._read_seq = self._seq
+            return self._seq, self._item
+
+
+class CapturedFrame:
+    def __init__(self, frame, index, captured_at):
+        self.frame = frame
+        self.index = index
+        self.captured_at = captured_at
+
+
+class GestureResult:
+    def __init__(self, frame, left, right, index, captured_at, inferred_at):
+        self.frame = frame
+        self.left = left
+        self.right = right
+        self.index = index
+        self.captured_at = captured_at
+        self.inferred_at = inferred_at
+
+    def age(self, now=None):
+        """Seconds between camera capture and now"""
+        return (time.perf_counter() if now is None else now) - self.captured_at
+
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a cv2.VideoCapture into a latest-frame-only slot"""
+    def __init__(self, cap, slot):
+        super().__init__(daemon=True)
+        self.slot = slot
+        self._cap = cap
+        self._cap_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.frames_read = 0
+
+    def set_capture(self, cap):
+        """Swap the capture device, releasing the old one"""
+        with self._cap_lock:
+            old, self._cap = self._cap, cap
+        if old is not None and old is not cap:
+            old.release()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self._cap_lock:
+                cap = self._cap
+                with telemetry.stage("cap.read"):
+                    ret, frame = cap.read() if cap is not None else (False, None)
+            if not ret:
+                time.sleep(0.01)
+                continue
+            self.frames_read += 1
+            self.slot.put(CapturedFrame(frame, self.frames_read, time.perf_counter()))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Runs hand tracking on the newest captured frame and publishes gestures"""
+    def __init__(self, hand_tracker, frame_slot, result_slot):
+        super().__init__(daemon=True)
+        self.hand_tracker = hand_tracker
+        self.frame_slot = frame_slot
+        self.result_slot = result_slot
+        self._stop_event = threading.Event()
+        self.frames_inferred = 0
+
+    def run(self):
+        seq = 0
+        while not self._stop_event.is_set():
+            seq, captured = self.frame_slot.get(seq, timeout=0.1)
+            if captured is None:
+                continue
+            with telemetry.stage("detect_gestures"):
+                frame, left, right = self.hand_tracker.detect_gestures(captured.frame)
+            self.frames_inferred += 1
+            self.result_slot.put(GestureResult(
+                frame, left, right, captured.index,
+                captured.captured_at, time.perf_counter()
+            ))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class PipelineStats:
+    """Rolling counters for render fps, inference fps and frame staleness"""
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self._reset(time.perf_counter())
+
+    def _reset(self, now):
+        self.window_start = now
+        self.renders = 0
+        self.results = 0
+        self.total_age = 0.0
+        self.max_age = 0.0
+
+    def record_render(self):
+        self.renders += 1
+
+    def record_result(self, age):
+        self.results += 1
+        self.total_age += age
+        self.max_age = max(self.max_age, age)
+
+    def maybe_report(self, capture, worker, frame_slot):
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed < self.interval:
+            return None
+        mean_age = self.total_age / self.results if self.results else 0.0
+        report = (f"render {self.renders / elapsed:.1f} fps | "
+                  f"inference {self.results / elapsed:.1f} fps | "
+                  f"staleness mean {mean_age * 1000:.0f} ms, max {self.max_age * 1000:.0f} ms | "
+                  f"captured {capture.frames_read}, inferred {worker.frames_inferred}, "
+                  f"dropped {frame_slot.dropped}")
+        self._reset(now)
+        return report
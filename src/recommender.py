@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+NOISE = -1
+
+
+class RecommendationEngine:
+    """Cluster-restricted nearest-movie search over a genre feature matrix
+
+    Replaces recommend_movies_kmeans / recommend_movies_dbscan from
+    recommendation_system.ipynb. Features live in one contiguous float64
+    array, titles map to rows through a dict, and every cluster keeps an
+    index array of its members. Two aggregation modes match the notebook:
+
+        'sum'     - rank by summed distance to the query movies (k-means / agglomerative)
+        'nearest' - rank by distance to the closest query movie (DBSCAN)
+
+    Query movies labelled as DBSCAN noise (-1) are skipped.
+    """
+    def __init__(self, features, titles, labels):
+        self.features = np.ascontiguousarray(features, dtype=np.float64)
+        self.titles = np.asarray(titles, dtype=object)
+        self.labels = np.asarray(labels)
+        self.sq_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+        # Duplicate titles resolve to their first row, like df[df['title'] == t].index[0]
+        self.title_codes, unique_titles = pd.factorize(self.titles)
+        self.index = {}
+        for row, title in enumerate(self.titles):
+            self.index.setdefault(title, row)
+
+        order = np.argsort(self.labels, kind='stable')
+        cluster_ids, starts = np.unique(self.labels[order], return_index=True)
+        self.members = dict(zip(cluster_ids.tolist(), np.split(order, starts[1:])))
+
+    @classmethod
+    def from_dataframe(cls, df, features, label_column='cluster', title_column='title'):
+        """Build from the notebook's df and its feature frame or array"""
+        values = features.to_numpy() if hasattr(features, 'to_numpy') else features
+        return cls(values, df[title_column].to_numpy(), df[label_column].to_numpy())
+
+    def _rows(self, titles):
+        rows = []
+        for title in titles:
+            row = self.index.get(title)
+            if row is None:
+                print(f"Movie '{title}' not found in the dataset.")
+            elif self.labels[row] == NOISE:
+                print(f"Movie '{title}' is considered noise by DBSCAN. Skipping.")
+            else:
+                rows.append(row)
+        return rows
+
+    def _member_distances(self, query_rows):
+        """{query row: (member rows, distances)} with one matrix product per cluster"""
+        query_rows = np.unique(np.asarray(query_rows, dtype=np.intp))
+        result = {}
+        query_labels = self.labels[query_rows]
+        for label in np.unique(query_labels):
+            queries = query_rows[query_labels == label]
+            members = self.members[label.item()]
+            # ||a - b||² = ||a||² + ||b||² - 2 a·b, clipped against rounding below zero
+            squared = (self.sq_norms[queries, None] + self.sq_norms[None, members]
+                       - 2.0 * self.features[queries] @ self.features[members].T)
+            distances = np.sqrt(np.maximum(squared, 0.0))
+            for query, row_distances in zip(queries, distances):
+                # The query's own title is never recommended
+                keep = self.title_codes[members] != self.title_codes[query]
+                result[query] = (members[keep], row_distances[keep])
+        return result
+
+    def _aggregate(self, rows, distances, mode, top_n):
+        if not rows:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        candidates = np.concatenate([distances[row][0] for row in rows])
+        values = np.concatenate([distances[row][1] for row in rows])
+        if mode == 'sum':
+            scores = np.bincount(candidates, weights=values, minlength=len(self.features))
+            present = np.bincount(candidates, minlength=len(self.features)) > 0
+        elif mode == 'nearest':
+            scores = np.full(len(self.features), np.inf)
+            np.minimum.at(scores, candidates, values)
+            present = np.isfinite(scores)
+        else:
+            raise ValueError(f"Unknown mode {mode!r}, expected 'sum' or 'nearest'")
+
+        pool = np.flatnonzero(present)
+        if len(pool) > top_n:
+            pool = pool[np.argpartition(scores[pool], top_n - 1)[:top_n]]
+        pool = pool[np.argsort(scores[pool], kind='stable')]
+        return pool, scores[pool]
+
+    def query(self, titles, top_n=5, mode='sum'):
+        """(rows, scores) of the top_n recommendations for one list of titles"""
+        rows = self._rows(titles)
+        return self._aggregate(rows, self._member_distances(rows), mode, top_n)
+
+    def query_batch(self, title_lists, top_n=5, mode='sum'):
+        """query() for many users at once, sharing distance work across users"""
+        user_rows = [self._rows(titles) for titles in title_lists]
+        distances = self._member_distances([row for rows in user_rows for row in rows])
+        return [self._aggregate(rows, distances, mode, top_n) for rows in user_rows]
+
+    def _frame(self, rows, scores, column):
+        return pd.DataFrame({'title': self.titles[rows], column: scores})
+
+    def recommend(self, titles, top_n=5, mode='sum'):
+        """DataFrame of recommendations, columns as in the notebook functions"""
+        rows, scores = self.query(titles, top_n, mode)
+        column = 'total_distance' if mode == 'sum' and len(titles) > 1 else 'distance'
+        return self._frame(rows, scores, column)
+
+    def recommend_batch(self, title_lists, top_n=5, mode='sum'):
+        return [
+            self._frame(rows, scores, 'total_distance' if mode == 'sum' and len(titles) > 1 else 'distance')
+            for titles, (rows, scores) in zip(title_lists, self.query_batch(title_lists, top_n, mode))
+        ]
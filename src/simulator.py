@@ -1,17 +1,226 @@
+import ctypes
+import time
 import numpy as np
+from gestures import GESTURE_CODES, GESTURES
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from OpenGL.GL.shaders import compileShader
 import pygame
 from pygame.locals import *
 
+# Unit cube (+-1) as GL_QUADS, 6 faces x 4 vertices
+CUBE_VERTICES = np.array([
+    [1, -1, -1], [1, 1, -1], [-1, 1, -1], [-1, -1, -1],  # Front
+    [1, -1, 1], [1, 1, 1], [-1, -1, 1], [-1, 1, 1]       # Back
+], dtype=np.float32)
+CUBE_SURFACES = [
+    [0, 1, 2, 3],  # Front
+    [3, 2, 7, 6],  # Left
+    [6, 7, 5, 4],  # Back
+    [4, 5, 1, 0],  # Right
+    [1, 5, 7, 2],  # Top
+    [4, 0, 3, 6]   # Bottom
+]
+CUBE_QUADS = CUBE_VERTICES[np.ravel(CUBE_SURFACES)]
+
+def _translate(x, y, z):
+    m = np.eye(4)
+    m[:3, 3] = (x, y, z)
+    return m
+
+def _scale(x, y, z):
+    return np.diag([x, y, z, 1.0])
+
+def _rotate_y(degrees):
+    c, s = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    m = np.eye(4)
+    m[0, 0], m[0, 2], m[2, 0], m[2, 2] = c, s, -s, c
+    return m
+
+def _build_drone_mesh():
+    """Bake the body, arms, hubs and blades into one GL_QUADS vertex array"""
+    parts = [_scale(0.2, 0.2, 0.2)]  # Body (center cube)
+    for angle in range(0, 360, 90):
+        arm = _rotate_y(angle)
+        parts.append(arm @ _translate(0.4, 0, 0) @ _scale(0.8, 0.05, 0.05))  # Arm
+        parts.append(arm @ _translate(0.8, 0, 0) @ _scale(0.1, 0.1, 0.1))    # Propeller hub
+        for blade in range(2):  # Propeller blades
+            parts.append(arm @ _translate(0.8, 0, 0) @ _rotate_y(blade * 180)
+                         @ _translate(0.2, 0, 0) @ _scale(0.4, 0.02, 0.1))
+    
+    quads = np.hstack([CUBE_QUADS, np.ones((len(CUBE_QUADS), 1), dtype=np.float32)])
+    return np.concatenate([(quads @ m.T)[:, :3] for m in parts]).astype(np.float32)
+
+DRONE_MESH = _build_drone_mesh()
+
+# Instanced drone shaders: the mesh stays in a static buffer and every drone
+# is one instance, rotated like glRotatef x then y then z and then translated
+DRONE_VERTEX_SHADER = """
+#version 120
+attribute vec3 vertex;
+attribute vec3 offset;
+attribute vec3 angles;
+attribute vec3 color;
+varying vec3 view_position;
+varying vec3 drone_color;
+
+void main() {
+    vec3 c = cos(radians(angles));
+    vec3 s = sin(radians(angles));
+    mat3 rx = mat3(1.0, 0.0, 0.0, 0.0, c.x, s.x, 0.0, -s.x, c.x);
+    mat3 ry = mat3(c.y, 0.0, -s.y, 0.0, 1.0, 0.0, s.y, 0.0, c.y);
+    mat3 rz = mat3(c.z, s.z, 0.0, -s.z, c.z, 0.0, 0.0, 0.0, 1.0);
+    vec4 world = vec4(rx * ry * rz * vertex + offset, 1.0);
+    view_position = (gl_ModelViewMatrix * world).xyz;
+    drone_color = color;
+    gl_Position = gl_ModelViewProjectionMatrix * world;
+}
+"""
+
+DRONE_FRAGMENT_SHADER = """
+#version 120
+varying vec3 view_position;
+varying vec3 drone_color;
+
+void main() {
+    // Flat face normal from screen-space derivatives, lit by GL_LIGHT0
+    vec3 normal = normalize(cross(dFdx(view_position), dFdy(view_position)));
+    vec3 light = normalize(gl_LightSource[0].position.xyz);
+    vec3 shade = gl_LightModel.ambient.rgb + gl_LightSource[0].ambient.rgb
+        + gl_LightSource[0].diffuse.rgb * abs(dot(normal, light));
+    gl_FragColor = vec4(drone_color * shade, 1.0);
+}
+"""
+
+def rotation_matrices(rotations):
+    """(N, 3) pitch/yaw/roll in degrees to (N, 3, 3), matching glRotatef x then y then z"""
+    c = np.cos(np.radians(rotations))
+    s = np.sin(np.radians(rotations))
+    n = len(rotations)
+    rx = np.zeros((n, 3, 3))
+    rx[:, 0, 0] = 1
+    rx[:, 1, 1], rx[:, 1, 2], rx[:, 2, 1], rx[:, 2, 2] = c[:, 0], -s[:, 0], s[:, 0], c[:, 0]
+    ry = np.zeros((n, 3, 3))
+    ry[:, 1, 1] = 1
+    ry[:, 0, 0], ry[:, 0, 2], ry[:, 2, 0], ry[:, 2, 2] = c[:, 1], s[:, 1], -s[:, 1], c[:, 1]
+    rz = np.zeros((n, 3, 3))
+    rz[:, 2, 2] = 1
+    rz[:, 0, 0], rz[:, 0, 1], rz[:, 1, 0], rz[:, 1, 1] = c[:, 2], -s[:, 2], s[:, 2], c[:, 2]
+    return rx @ ry @ rz
+
+# Per-command unit step, indexed by gesture code
+COMMAND_DELTAS = np.zeros((len(GESTURES), 3))
+COMMAND_DELTAS[GESTURE_CODES["UP"]] = (0, 1, 0)
+COMMAND_DELTAS[GESTURE_CODES["DOWN"]] = (0, -1, 0)
+COMMAND_DELTAS[GESTURE_CODES["LEFT"]] = (-1, 0, 0)
+COMMAND_DELTAS[GESTURE_CODES["RIGHT"]] = (1, 0, 0)
+COMMAND_DELTAS[GESTURE_CODES["FORWARD"]] = (0, 0, 1)
+COMMAND_DELTAS[GESTURE_CODES["BACKWARD"]] = (0, 0, -1)
+NO_COMMAND = GESTURE_CODES[None]
+CIRCLE = GESTURE_CODES["CIRCLE"]
+
+BOUNDS_LOW = np.array([-5.0, -3.0, -15.0])
+BOUNDS_HIGH = np.array([5.0, 3.0, -5.0])
+
+# Red drones follow a left hand, blue drones a right hand
+GROUP_COLORS = np.array([(1.0, 0.0, 0.0), (0.0, 0.0, 1.0)])
+FORMATION_CENTER = np.array([0.0, 0.0, -10.0])
+FORMATION_WIDTH = 8.0
+GROUP_EXTENT = np.array([0.75, 5.0, 8.0])  # x is a fraction of each group's slot
+
+def lattice_formation(count, center, extent):
+    """Place count drones on a cubic lattice filling a box around center"""
+    side = int(np.ceil(round(count ** (1 / 3), 6)))
+    if side <= 1:
+        return np.tile(center, (count, 1)).astype(float)
+    axis = np.linspace(-0.5, 0.5, side)
+    grid = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    return center + grid[:count] * extent
+
+def oscillation_keyframes(axis, amplitude, cycles=3, move_time=0.1, hold_times=(0.4, 0.4, 0.3)):
+    """Keyframes that swing +amplitude, -amplitude and back to rest along axis, cycles times"""
+    direction = np.zeros(3)
+    direction[axis] = amplitude
+    keyframes = [(0.0, np.zeros(3))]
+    t = 0.0
+    for _ in range(cycles):
+        for target, duration, hold in ((1, move_time, hold_times[0]),
+                                       (-1, 2 * move_time, hold_times[1]),
+                                       (0, move_time, hold_times[2])):
+            t += duration
+            keyframes.append((t, target * direction))
+            t += hold
+            keyframes.append((t, target * direction))
+    return keyframes
+
+class Animation:
+    """Time-based keyframed position offsets for a set of drones"""
+    def __init__(self, drones, keyframes, start):
+        self.drones = drones
+        self.times = start + np.array([t for t, _ in keyframes], dtype=float)
+        self.offsets = np.array([offset for _, offset in keyframes], dtype=float)
+        self.applied = np.zeros(3)
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def offset_at(self, now):
+        return np.array([np.interp(now, self.times, self.offsets[:, axis]) for axis in range(3)])
+
 class DroneSimulator:
-    def __init__(self, width=1000, height=600):
+    def __init__(self, width=1000, height=600, headless=False, num_drones=2, num_controllers=2):
         self.width = width
         self.height = height
         
+        # Headless simulators skip the window and GL state (benchmarks, CI)
+        self.headless = headless
+        if not headless:
+            self._init_window()
+        
+        # Swarm state as contiguous (N, 3) arrays, drone i is driven by controller groups[i].
+        # Controllers alternate left hand / right hand, one slot each side by side along x
+        self.num_drones = num_drones
+        self.num_controllers = num_controllers
+        self.groups = np.arange(num_drones) % num_controllers
+        slot_width = FORMATION_WIDTH / num_controllers
+        self.base_positions = np.zeros((num_drones, 3))
+        for group in range(num_controllers):
+            members = self.groups == group
+            center = FORMATION_CENTER + ((group - (num_controllers - 1) / 2) * slot_width, 0, 0)
+            extent = GROUP_EXTENT * (slot_width, 1, 1)
+            self.base_positions[members] = lattice_formation(int(members.sum()), center, extent)
+        self.positions = self.base_positions.copy()
+        self.rotations = np.zeros((num_drones, 3))
+        self.colors = GROUP_COLORS[self.groups % 2]
+        self.circle_angles = np.zeros(num_drones)
+        self._step = np.zeros((num_drones, 3))
+        
+        # Queued keyframe animations, advanced by tick() from the frame loop
+        self.animations = []
+        self._animation_end = np.zeros(num_drones)
+        
+        # Optional text lines drawn over the scene (performance HUD)
+        self.hud_lines = None
+        self._hud_font = None
+        self._hud_cache = {}
+        
+        # Optional CollisionLayer that keeps drones apart after every update
+        self.collision = None
+        
+        self.speed = 0.1
+        self.gesture_speed = 0.15
+        self.circle_radius = 1.0
+        self.circle_speed = 0.05
+
+    def _init_window(self):
         # Initialize Pygame
         pygame.init()
-        pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+        pygame.display.set_mode((self.width, self.height), DOUBLEBUF | OPENGL)
         pygame.display.set_caption("3D Drone Simulator")
         
         # Enable 3D rendering
@@ -28,25 +237,54 @@ class DroneSimulator:
         # Set up the camera
         self._setup_camera()
         
-        # Initialize drones
-        self.drones = [
-            {
-                'pos': np.array([-2.0, 0.0, -10.0], dtype=float),
-                'rot': np.array([0., 0., 0.]),
-                'color': (1.0, 0.0, 0.0)  # Red for drone 1
-            },
-            {
-                'pos': np.array([2.0, 0.0, -10.0], dtype=float),
-                'rot': np.array([0., 0., 0.]),
-                'color': (0.0, 0.0, 1.0)  # Blue for drone 2
-            }
-        ]
+        # Static geometry is built once: the grid as a display list, the drone
+        # mesh as a vertex buffer drawn once per drone by instancing
+        self.grid_list = self._build_grid_list()
+        self._drone_colors = None
+        self._instanced = self._build_drone_buffers()
+
+    def _build_drone_buffers(self):
+        """Upload the drone mesh and compile the instancing shader, False if unsupported"""
+        if not (bool(glDrawArraysInstanced) and bool(glVertexAttribDivisor)):
+            print("Instanced drawing unavailable, transforming drones on the CPU")
+            return False
+        try:
+            program = glCreateProgram()
+            glAttachShader(program, compileShader(DRONE_VERTEX_SHADER, GL_VERTEX_SHADER))
+            glAttachShader(program, compileShader(DRONE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+            # The per-vertex attribute must be generic attribute 0 in compatibility contexts
+            glBindAttribLocation(program, 0, "vertex")
+            glLinkProgram(program)
+            if not glGetProgramiv(program, GL_LINK_STATUS):
+                raise RuntimeError(glGetProgramInfoLog(program))
+        except RuntimeError as e:
+            print(f"Drone shader failed, transforming drones on the CPU: {e}")
+            return False
+        self._drone_program = program
+        self._drone_attributes = {name: glGetAttribLocation(program, name)
+                                  for name in ("vertex", "offset", "angles", "color")}
         
-        self.speed = 0.1
-        self.gesture_speed = 0.15
-        self.circle_radius = 1.0
-        self.circle_speed = 0.05
-        self.circle_angles = [0.0, 0.0]
+        self._mesh_buffer, self._pose_buffer, self._color_buffer = glGenBuffers(3)
+        glBindBuffer(GL_ARRAY_BUFFER, self._mesh_buffer)
+        glBufferData(GL_ARRAY_BUFFER, DRONE_MESH.nbytes, DRONE_MESH, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        # Positions and rotations are the only per-frame upload, 24 bytes per drone
+        self._poses = np.zeros((self.num_drones, 6), dtype=np.float32)
+        return True
+
+    def _build_grid_list(self):
+        grid_list = glGenLists(1)
+        glNewList(grid_list, GL_COMPILE)
+        glColor3f(0.5, 0.5, 0.5)
+        glBegin(GL_LINES)
+        for i in range(-5, 6):
+            glVertex3f(i, -3, -15)
+            glVertex3f(i, -3, -5)
+            glVertex3f(-5, -3, i-10)
+            glVertex3f(5, -3, i-10)
+        glEnd()
+        glEndList()
+        return grid_list
 
     def _setup_camera(self):
         glMatrixMode(GL_PROJECTION)
@@ -60,130 +298,169 @@ class DroneSimulator:
         glLoadIdentity()
         
         # Draw grid for reference
-        glPushMatrix()
-        glColor3f(0.5, 0.5, 0.5)
-        glBegin(GL_LINES)
-        for i in range(-5, 6):
-            glVertex3f(i, -3, -15)
-            glVertex3f(i, -3, -5)
-            glVertex3f(-5, -3, i-10)
-            glVertex3f(5, -3, i-10)
-        glEnd()
-        glPopMatrix()
+        glCallList(self.grid_list)
         
         # Draw drones
-        for drone in self.drones:
-            self.draw_drone(drone)
+        self.draw_drones()
+        
+        if self.hud_lines:
+            self._draw_hud(self.hud_lines)
         
         pygame.display.flip()
 
-    def draw_drone(self, drone):
-        glPushMatrix()
-        glTranslatef(*drone['pos'])
-        glRotatef(drone['rot'][0], 1, 0, 0)  # Pitch
-        glRotatef(drone['rot'][1], 0, 1, 0)  # Yaw
-        glRotatef(drone['rot'][2], 0, 0, 1)  # Roll
-        
-        # Set drone color
-        glColor3f(*drone['color'])
-        
-        # Draw drone body (center cube)
-        glPushMatrix()
-        glScalef(0.2, 0.2, 0.2)
-        self._draw_cube()
-        glPopMatrix()
-        
-        # Draw drone arms
-        for angle in range(0, 360, 90):
-            glPushMatrix()
-            glRotatef(angle, 0, 1, 0)
-            
-            # Draw arm
-            glPushMatrix()
-            glTranslatef(0.4, 0, 0)
-            glScalef(0.8, 0.05, 0.05)  # Make it long and thin
-            self._draw_cube()
-            glPopMatrix()
-            
-            # Draw propeller hub
-            glPushMatrix()
-            glTranslatef(0.8, 0, 0)
-            glScalef(0.1, 0.1, 0.1)
-            self._draw_cube()
-            glPopMatrix()
-            
-            # Draw propeller blades
-            for blade in range(2):
-                glPushMatrix()
-                glTranslatef(0.8, 0, 0)
-                glRotatef(blade * 180, 0, 1, 0)
-                glTranslatef(0.2, 0, 0)
-                glScalef(0.4, 0.02, 0.1)
-                self._draw_cube()
-                glPopMatrix()
-            
-            glPopMatrix()
-        
-        glPopMatrix()
-
-    def _draw_cube(self):
-        """Draw a simple cube using GL_QUADS"""
-        vertices = [
-            [1, -1, -1], [1, 1, -1], [-1, 1, -1], [-1, -1, -1],  # Front
-            [1, -1, 1], [1, 1, 1], [-1, -1, 1], [-1, 1, 1]       # Back
-        ]
-        
-        surfaces = [
-            [0, 1, 2, 3],  # Front
-            [3, 2, 7, 6],  # Left
-            [6, 7, 5, 4],  # Back
-            [4, 5, 1, 0],  # Right
-            [1, 5, 7, 2],  # Top
-            [4, 0, 3, 6]   # Bottom
-        ]
-        
-        glBegin(GL_QUADS)
-        for surface in surfaces:
-            for vertex in surface:
-                glVertex3fv(vertices[vertex])
-        glEnd()
+    def _draw_hud(self, lines):
+        """Blit text lines to the top-left corner of the window"""
+        if self._hud_font is None:
+            pygame.font.init()
+            self._hud_font = pygame.font.SysFont("monospace", 14)
+        
+        # Rendered text is cached per line, the HUD changes a few times a second
+        cache = {}
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        for i, line in enumerate(lines):
+            image = self._hud_cache.get(line)
+            if image is None:
+                surface = self._hud_font.render(line, True, (255, 255, 255), (0, 0, 0))
+                image = (surface.get_width(), surface.get_height(),
+                         pygame.image.tostring(surface, "RGBA", True))
+            cache[line] = image
+            width, height, data = image
+            glWindowPos2d(8, self.height - (i + 1) * (height + 2) - 4)
+            glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        glEnable(GL_LIGHTING)
+        glEnable(GL_DEPTH_TEST)
+        self._hud_cache = cache
 
-    def update(self, commands):
-        for i, command in enumerate(commands):
-            if command is None:
+    def draw_drones(self):
+        """Draw every drone with a single draw call"""
+        if self._instanced:
+            self._draw_drones_instanced()
+            return
+        
+        # Transform the shared mesh by each drone's rotation and position
+        vertices = np.matmul(rotation_matrices(self.rotations).astype(np.float32), DRONE_MESH.T)
+        vertices = vertices.transpose(0, 2, 1) + self.positions[:, None, :].astype(np.float32)
+        vertices = np.ascontiguousarray(vertices).reshape(-1, 3)
+        
+        # Per-vertex colors only change when the drone set does
+        if self._drone_colors is None or len(self._drone_colors) != len(vertices):
+            colors = self.colors.astype(np.float32)
+            self._drone_colors = np.ascontiguousarray(np.repeat(colors, len(DRONE_MESH), axis=0))
+        
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glColorPointer(3, GL_FLOAT, 0, self._drone_colors)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def _draw_drones_instanced(self):
+        """One instance of the retained mesh per drone, only poses are uploaded"""
+        attributes = self._drone_attributes
+        self._poses[:, :3] = self.positions
+        self._poses[:, 3:] = self.rotations
+        glBindBuffer(GL_ARRAY_BUFFER, self._pose_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self._poses.nbytes, self._poses, GL_STREAM_DRAW)
+        
+        # Per-drone colors only change when the drone set does
+        if self._drone_colors is None or len(self._drone_colors) != self.num_drones:
+            self._drone_colors = np.ascontiguousarray(self.colors, dtype=np.float32)
+            glBindBuffer(GL_ARRAY_BUFFER, self._color_buffer)
+            glBufferData(GL_ARRAY_BUFFER, self._drone_colors.nbytes, self._drone_colors, GL_STATIC_DRAW)
+        
+        glUseProgram(self._drone_program)
+        for buffer, name, stride, offset, divisor in (
+                (self._mesh_buffer, "vertex", 0, 0, 0),
+                (self._pose_buffer, "offset", 24, 0, 1),
+                (self._pose_buffer, "angles", 24, 12, 1),
+                (self._color_buffer, "color", 0, 0, 1)):
+            glBindBuffer(GL_ARRAY_BUFFER, buffer)
+            glEnableVertexAttribArray(attributes[name])
+            glVertexAttribPointer(attributes[name], 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+            glVertexAttribDivisor(attributes[name], divisor)
+        glDrawArraysInstanced(GL_QUADS, 0, len(DRONE_MESH), self.num_drones)
+        for location in attributes.values():
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glUseProgram(0)
+
+    def animate(self, keyframes, drones=None, now=None):
+        """Queue a keyframed motion, keyframes are (seconds, (dx, dy, dz)) pairs
+
+        The motion starts once earlier animations on the same drones end and
+        is applied as an offset, so gesture commands keep working on top of it.
+        """
+        now = time.perf_counter() if now is None else now
+        drones = np.arange(self.num_drones) if drones is None else np.asarray(drones)
+        start = max(now, self._animation_end[drones].max())
+        animation = Animation(drones, keyframes, start)
+        self._animation_end[drones] = animation.end
+        self.animations.append(animation)
+        return animation
+
+    def tick(self, now=None):
+        """Advance queued animations to the current time without blocking"""
+        if not self.animations:
+            return
+        now = time.perf_counter() if now is None else now
+        for animation in self.animations:
+            if now < animation.start:
                 continue
-                
-            if command == "CIRCLE":
-                # Update circle angle
-                self.circle_angles[i] += self.circle_speed
-                
-                # Calculate new position in XZ plane
-                base_x = -2.0 if i == 0 else 2.0
-                self.drones[i]['pos'][0] = base_x + self.circle_radius * np.cos(self.circle_angles[i])
-                self.drones[i]['pos'][2] = -10.0 + self.circle_radius * np.sin(self.circle_angles[i])
-                
-                # Add rotation for visual effect
-                self.drones[i]['rot'][1] = np.degrees(self.circle_angles[i])  # Rotate around Y axis
-            else:
-                if command == "UP":
-                    self.drones[i]['pos'][1] += self.speed
-                elif command == "DOWN":
-                    self.drones[i]['pos'][1] -= self.speed
-                elif command == "LEFT":
-                    self.drones[i]['pos'][0] -= self.speed
-                elif command == "RIGHT":
-                    self.drones[i]['pos'][0] += self.speed
-                elif command == "FORWARD":
-                    self.drones[i]['pos'][2] += self.speed
-                elif command == "BACKWARD":
-                    self.drones[i]['pos'][2] -= self.speed
-                
-                # Reset rotation when not circling
-                self.drones[i]['rot'] = np.array([0., 0., 0.])
+            offset = animation.offset_at(now)
+            self.positions[animation.drones] += offset - animation.applied
+            animation.applied = offset
+        self.animations = [a for a in self.animations if now < a.end]
+        
+        # Keep drones within bounds
+        np.clip(self.positions, BOUNDS_LOW, BOUNDS_HIGH, out=self.positions)
+
+    def command_codes(self, commands):
+        """Turn commands into one integer code per drone
+
+        Accepts gesture names (None for no command) or integer codes, either
+        one per drone or one per controller group.
+        """
+        codes = np.asarray(commands)
+        if codes.dtype.kind not in 'iu':
+            codes = np.array([GESTURE_CODES[command] for command in commands], dtype=np.uint8)
+        elif len(codes) and (codes.min() < 0 or codes.max() >= len(GESTURES)):
+            raise ValueError(f"Gesture codes must be in [0, {len(GESTURES)}), got {codes.min()}..{codes.max()}")
+        if len(codes) == self.num_drones:
+            return codes
+        if len(codes) == self.num_controllers:
+            return codes[self.groups]
+        raise ValueError(f"Expected {self.num_drones} drone or {self.num_controllers} controller commands, "
+                         f"got {len(codes)}")
+
+    def update(self, commands):
+        codes = self.command_codes(commands)
+        active = codes != NO_COMMAND
+        circling = codes == CIRCLE
+        
+        # Straight moves, the delta table is zero for STOP, CIRCLE and no command
+        np.take(COMMAND_DELTAS, codes, axis=0, out=self._step)
+        self._step *= self.speed
+        self.positions += self._step
+        
+        # Reset rotation when not circling
+        self.rotations[active & ~circling] = 0.0
+        
+        if circling.any():
+            # Move circling drones around their base position in the XZ plane
+            self.circle_angles[circling] += self.circle_speed
+            angles = self.circle_angles[circling]
+            base = self.base_positions[circling]
+            self.positions[circling, 0] = base[:, 0] + self.circle_radius * np.cos(angles)
+            self.positions[circling, 2] = base[:, 2] + self.circle_radius * np.sin(angles)
             
-            # Keep drones within bounds
-            self.drones[i]['pos'] = np.clip(
-                self.drones[i]['pos'],
-                [-5.0, -3.0, -15.0],
-                [5.0, 3.0, -5.0]
-            ) 
\ No newline at end of file
+            # Add rotation for visual effect
+            self.rotations[circling, 1] = np.degrees(angles)  # Rotate around Y axis
+        
+        if self.collision is not None:
+            self.collision.apply(self.positions)
+        
+        # Keep drones within bounds
+        np.clip(self.positions, BOUNDS_LOW, BOUNDS_HIGH, out=self.positions)
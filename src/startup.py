@@ -0,0 +1,73 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Times imports and constructors and reports the breakdown at the first frame"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.steps = []
+        self._lock = threading.Lock()
+        self.reported = False
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.steps.append((name, seconds))
+
+    def first_frame(self):
+        """Print the startup report once, call after the first frame is rendered"""
+        if self.reported:
+            return
+        self.reported = True
+        total = time.perf_counter() - self.start
+        print("\nStartup report:")
+        with self._lock:
+            for name, seconds in self.steps:
+                print(f"  {name:<40}{seconds * 1000:>8.0f} ms")
+        print(f"  {'time to first frame':<40}{total * 1000:>8.0f} ms")
+
+
+class LazySubsystem:
+    """Builds an expensive object on first use or on a background warm-up thread"""
+    def __init__(self, name, factory, profiler=None):
+        self.name = name
+        self._factory = factory
+        self._profiler = profiler
+        self._lock = threading.Lock()
+        self._instance = None
+        self.failed = False
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        """Return the instance, building it now if needed (None if it failed to load)"""
+        with self._lock:
+            if self._instance is None and not self.failed:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    print(f"Could not load {self.name}: {e}")
+                    self.failed = True
+                if self._profiler is not None:
+                    self._profiler.record(f"{self.name} (lazy)", time.perf_counter() - start)
+            return self._instance
+
+    def warm_up(self):
+        """Start loading in the background so a later get() returns immediately"""
+        if self.loaded or self.failed:
+            return None
+        thread = threading.Thread(target=self.get, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,314 @@
+"""Binary pose/command streaming for DroneSimulator over UDP or Unix datagrams
+
+Every datagram starts with a fixed little-endian header:
+
+    magic 4s | version u8 | type u8 | count u16 | seq u32 | timestamp f8 | first u32 | chunk u16 | chunks u16
+
+POSES datagrams carry `count` POSE_DTYPE records starting at drone `first`;
+a snapshot larger than one datagram is split into `chunks` datagrams that
+share a seq. COMMANDS datagrams carry `count` uint8 gesture codes, one per
+controller or one per drone. SUBSCRIBE datagrams (no payload) register the
+sender for snapshots and must be repeated as a heartbeat.
+
+Addresses are "host:port" or ":port" for UDP, anything else is a Unix
+socket path.
+"""
+import os
+import socket
+import stat
+import struct
+import tempfile
+import time
+import numpy as np
+from gestures import GESTURES
+
+MAGIC = b'DRNS'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHIdIHH')
+
+POSES = 1
+SUBSCRIBE = 2
+UNSUBSCRIBE = 3
+COMMANDS = 4
+
+POSE_DTYPE = np.dtype([
+    ('id', '<u4'),
+    ('group', '<u2'),
+    ('flags', '<u2'),
+    ('position', '<f4', (3,)),
+    ('rotation', '<f4', (3,)),
+])
+
+MAX_DATAGRAM = 32768
+DEFAULT_PORT = 47800
+
+
+def parse_address(address):
+    """('host', port) for UDP or a filesystem path for a Unix datagram socket"""
+    if isinstance(address, tuple):
+        return address
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+def _open_socket(address):
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    return socket.socket(family, socket.SOCK_DGRAM)
+
+
+def _remove_socket(path):
+    """Unlink a stale Unix socket file, refusing to touch anything else at path"""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket, not removing it")
+    os.unlink(path)
+
+
+def pack_header(kind, seq, count=0, timestamp=None, first=0, chunk=0, chunks=1):
+    return HEADER.pack(MAGIC, VERSION, kind, count, seq & 0xFFFFFFFF,
+                       time.time() if timestamp is None else timestamp, first, chunk, chunks)
+
+
+def unpack_header(data):
+    """(kind, count, seq, timestamp, first, chunk, chunks) or None for foreign packets"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, kind, count, seq, timestamp, first, chunk, chunks = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return kind, count, seq, timestamp, first, chunk, chunks
+
+
+class StateStreamServer:
+    """Publishes simulator pose snapshots and collects external commands
+
+    Call step() once per frame: it drains pending packets without blocking
+    and sends the current poses to every live subscriber. Commands are not
+    applied here; the frame loop takes them with take_commands() and folds
+    them into its own single simulator.update().
+    """
+    def __init__(self, simulator, address=('127.0.0.1', DEFAULT_PORT), max_datagram=MAX_DATAGRAM,
+                 subscriber_timeout=5.0):
+        self.simulator = simulator
+        self.address = parse_address(address)
+        self.subscriber_timeout = subscriber_timeout
+        if isinstance(self.address, str):
+            _remove_socket(self.address)
+        self.sock = _open_socket(self.address)
+        self.sock.bind(self.address)
+        self.sock.setblocking(False)
+        if not isinstance(self.address, str):
+            self.address = self.sock.getsockname()
+        self.subscribers = {}
+        self.seq = 0
+        self.published = 0
+        self.commands_received = 0
+        self.commands_rejected = 0
+        self.commands_applied = 0
+        self._command_seq = {}
+        self._pending_commands = None
+
+        # One preallocated datagram per chunk; records are written through
+        # structured views, so publishing never builds Python objects per drone
+        per_datagram = (max_datagram - HEADER.size) // POSE_DTYPE.itemsize
+        n = simulator.num_drones
+        self._chunks = []
+        for first in range(0, max(n, 1), per_datagram):
+            count = min(per_datagram, n - first)
+            buffer = bytearray(HEADER.size + count * POSE_DTYPE.itemsize)
+            records = np.frombuffer(buffer, dtype=POSE_DTYPE, offset=HEADER.size, count=count)
+            records['id'] = np.arange(first, first + count)
+            records['group'] = simulator.groups[first:first + count]
+            self._chunks.append((first, count, buffer, records))
+
+    def poll(self):
+        """Drain incoming packets, returns the number handled"""
+        handled = 0
+        while True:
+            try:
+                data, sender = self.sock.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return handled
+            header = unpack_header(data)
+            if header is None:
+                continue
+            handled += 1
+            kind, count, seq = header[:3]
+            if kind == SUBSCRIBE:
+                self.subscribers[sender] = time.monotonic()
+            elif kind == UNSUBSCRIBE:
+                self.subscribers.pop(sender, None)
+            elif kind == COMMANDS:
+                self.commands_received += 1
+                commands = self._valid_commands(data, count)
+                if commands is None:
+                    self.commands_rejected += 1
+                    continue
+                # Datagrams can arrive out of order, never apply an older command
+                last = self._command_seq.get(sender)
+                if last is not None and ((seq - last) & 0xFFFFFFFF) >= 0x80000000:
+                    continue
+                self._command_seq[sender] = seq
+                self._pending_commands = commands
+
+    def _valid_commands(self, data, count):
+        """Gesture codes of a COMMANDS datagram, or None if it is malformed
+
+        The payload must hold count codes, one per controller or one per
+        drone, each a valid gesture code; anything else is dropped so a bad
+        sender cannot crash the simulator.
+        """
+        if count not in (self.simulator.num_controllers, self.simulator.num_drones):
+            return None
+        if len(data) - HEADER.size < count:
+            return None
+        codes = np.frombuffer(data, dtype=np.uint8, offset=HEADER.size, count=count).copy()
+        if len(codes) and codes.max() >= len(GESTURES):
+            return None
+        return codes
+
+    def take_commands(self):
+        """Newest command codes received since the last call, or None
+
+        The caller is expected to apply them, so they count as applied.
+        """
+        commands, self._pending_commands = self._pending_commands, None
+        if commands is not None:
+            self.commands_applied += 1
+        return commands
+
+    def publish(self, timestamp=None):
+        """Send one pose snapshot to every live subscriber"""
+        now = time.monotonic()
+        for subscriber, seen in list(self.subscribers.items()):
+            if now - seen > self.subscriber_timeout:
+                del self.subscribers[subscriber]
+        if not self.subscribers:
+            return 0
+        self.seq += 1
+        timestamp = time.time() if timestamp is None else timestamp
+        positions = self.simulator.positions
+        rotations = self.simulator.rotations
+        for chunk, (first, count, buffer, records) in enumerate(self._chunks):
+            records['position'] = positions[first:first + count]
+            records['rotation'] = rotations[first:first + count]
+            HEADER.pack_into(buffer, 0, MAGIC, VERSION, POSES, count, self.seq, timestamp,
+                             first, chunk, len(self._chunks))
+            for subscriber in list(self.subscribers):
+                try:
+                    self.sock.sendto(buffer, subscriber)
+                except BlockingIOError:
+                    # A full socket buffer drops this frame for this subscriber
+                    pass
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The client is gone; it can subscribe again if it comes back
+                    del self.subscribers[subscriber]
+        self.published += 1
+        return len(self.subscribers)
+
+    def step(self):
+        """Per-frame hook: receive packets and publish poses"""
+        self.poll()
+        self.publish()
+
+    def close(self):
+        self.sock.close()
+        if isinstance(self.address, str):
+            _remove_socket(self.address)
+
+
+class StateStreamClient:
+    """Subscribes to a StateStreamServer and sends it commands"""
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT), heartbeat=1.0, receive_buffer=1 << 22):
+        self.server = parse_address(address)
+        self.sock = _open_socket(self.server)
+        self._local_path = None
+        if isinstance(self.server, str):
+            # Unix datagram replies need a bound client address
+            self._local_path = os.path.join(tempfile.gettempdir(), f"drone_stream_{os.getpid()}_{id(self)}")
+            _remove_socket(self._local_path)
+            self.sock.bind(self._local_path)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.heartbeat = heartbeat
+        self._last_subscribe = 0.0
+        self._command_seq = 0
+        self._partial = {}
+        self.last_seq = 0
+        self.frames = 0
+        self.dropped = 0
+
+    def _send(self, data):
+        self.sock.sendto(data, self.server)
+
+    def subscribe(self):
+        self._send(pack_header(SUBSCRIBE, 0))
+        self._last_subscribe = time.monotonic()
+
+    def unsubscribe(self):
+        self._send(pack_header(UNSUBSCRIBE, 0))
+
+    def send_commands(self, commands):
+        """Gesture names or codes, one per controller or one per drone"""
+        from gestures import GESTURE_CODES
+
+        codes = np.asarray([GESTURE_CODES[c] if c is None or isinstance(c, str) else c for c in commands],
+                           dtype=np.uint8)
+        self._command_seq += 1
+        self._send(pack_header(COMMANDS, self._command_seq, count=len(codes)) + codes.tobytes())
+
+    def receive(self, timeout=1.0):
+        """Next complete snapshot as (seq, timestamp, poses), or None on timeout
+
+        Chunks of one snapshot are reassembled; a newer snapshot completing
+        first makes older partial snapshots count as dropped.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now - self._last_subscribe >= self.heartbeat:
+                self.subscribe()
+            remaining = deadline - now
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(min(remaining, self.heartbeat))
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            header = unpack_header(data)
+            if header is None or header[0] != POSES:
+                continue
+            _, count, seq, timestamp, first, chunk, chunks = header
+            if seq <= self.last_seq:
+                continue
+            records = np.frombuffer(data, dtype=POSE_DTYPE, offset=HEADER.size, count=count)
+            if chunks == 1:
+                return self._complete(seq, timestamp, records)
+            parts = self._partial.setdefault(seq, {})
+            parts[chunk] = records
+            if len(parts) == chunks:
+                del self._partial[seq]
+                return self._complete(seq, timestamp, np.concatenate([parts[i] for i in range(chunks)]))
+
+    def _complete(self, seq, timestamp, poses):
+        if self.last_seq:
+            self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.frames += 1
+        for stale in [s for s in self._partial if s < seq]:
+            del self._partial[stale]
+        return seq, timestamp, poses
+
+    def close(self):
+        try:
+            self.unsubscribe()
+        except OSError:
+            pass
+        self.sock.close()
+        if self._local_path:
+            _remove_socket(self._local_path)
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+import numpy as np
+
+# Histogram bucket edges in milliseconds, shared by every stage
+HISTOGRAM_EDGES_MS = np.array([0, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16.7, 33.3, 50, 100, 250, 1000, np.inf])
+
+_DISABLED = nullcontext()
+
+
+class StageStats:
+    """Rolling window of latencies and call times for one stage"""
+    def __init__(self, window=512):
+        self.durations = np.zeros(window)
+        self.times = np.zeros(window)
+        self.calls = 0
+
+    def add(self, seconds, now):
+        slot = self.calls % len(self.durations)
+        self.durations[slot] = seconds
+        self.times[slot] = now
+        self.calls += 1
+
+    def summary(self, now):
+        filled = min(self.calls, len(self.durations))
+        durations_ms = self.durations[:filled] * 1000
+        times = self.times[:filled]
+        p50, p95, p99 = np.percentile(durations_ms, [50, 95, 99]) if filled else (0.0, 0.0, 0.0)
+        # Calls per second over the span covered by the window, capped at 1 s
+        span = min(now - times.min(), 1.0) if filled else 0.0
+        recent = np.count_nonzero(times >= now - span) if span > 0 else 0
+        return {
+            'calls': self.calls,
+            'rate': recent / span if span > 0 else 0.0,
+            'mean_ms': float(durations_ms.mean()) if filled else 0.0,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'histogram': np.histogram(durations_ms, HISTOGRAM_EDGES_MS)[0].tolist(),
+        }
+
+
+class _Stage:
+    __slots__ = ('telemetry', 'name', 'start')
+
+    def __init__(self, telemetry, name):
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.telemetry.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Telemetry:
+    """Per-stage latency histograms, fps counters, HUD text and JSON-lines snapshots
+
+    Disabled by default; stage() then returns a shared no-op context manager,
+    so instrumented code costs one method call per stage.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.flush_interval = 5.0
+        self.window = 512
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._frames = StageStats()
+        self._last_flush = time.perf_counter()
+        self._hud_lines = []
+        self._hud_updated = 0.0
+
+    def configure(self, enabled=True, path=None, flush_interval=5.0, window=512):
+        self.enabled = enabled
+        self.path = path
+        self.flush_interval = flush_interval
+        self.window = window
+        if path:
+            print(f"Writing telemetry snapshots to {path} every {flush_interval} s")
+
+    def stage(self, name):
+        """Context manager timing one call of a stage"""
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        now = time.perf_counter()
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = StageStats(self.window)
+            stats.add(seconds, now)
+
+    def frame(self):
+        """Count a rendered frame and write a snapshot when the flush interval passed"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._frames.add(0.0, now)
+        if self.path and now - self._last_flush >= self.flush_interval:
+            self._last_flush = now
+            self.flush()
+
+    def snapshot(self):
+        now = time.perf_counter()
+        with self._lock:
+            stages = {name: stats.summary(now) for name, stats in self._stats.items()}
+        return {
+            'time': time.time(),
+            'fps': self._frames.summary(now)['rate'],
+            'histogram_edges_ms': HISTOGRAM_EDGES_MS[1:-1].tolist(),
+            'stages': stages,
+        }
+
+    def flush(self):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def hud_lines(self, refresh=0.5):
+        """Text lines for an on-screen overlay, recomputed at most every refresh seconds"""
+        now = time.perf_counter()
+        if self.enabled and now - self._hud_updated >= refresh:
+            self._hud_updated = now
+            snapshot = self.snapshot()
+            self._hud_lines = [f"{snapshot['fps']:.0f} fps"] + [
+                f"{name}: {s['mean_ms']:.1f} ms avg, {s['p95_ms']:.1f} ms p95, {s['rate']:.0f}/s"
+                for name, s in sorted(snapshot['stages'].items())
+            ]
+        return self._hud_lines
+
+
+telemetry = Telemetry()
@@ -3,42 +3,135 @@ import numpy as np
 from vosk import Model, KaldiRecognizer
 import json
 import os
+import queue
+import time
+import wave
+from telemetry import telemetry
 
 class VoiceProcessor:
-    def __init__(self):
+    def __init__(self, block_duration=0.1, silence_threshold=500, silence_duration=0.8,
+                 max_duration=8.0, device_timeout=2.0):
         self.sample_rate = 16000
-        self.duration = 5  # Record for 5 seconds
         self.channels = 1
-        
+
+        # Streaming endpoint detection
+        self.block_size = int(self.sample_rate * block_duration)
+        self.silence_threshold = silence_threshold  # RMS of int16 samples
+        self.silence_duration = silence_duration    # Trailing silence that ends speech
+        self.max_duration = max_duration            # Hard cap per utterance, wall clock
+        self.device_timeout = device_timeout        # Longest wait for one microphone block
+        self.last_stats = {}
+
         # Download and load Vosk model
         if not os.path.exists("model"):
             print("Please download the model from https://alphacephei.com/vosk/models and unpack as 'model' in the current folder.")
             print("Recommended model: vosk-model-small-en-us-0.15")
             raise RuntimeError("Model not found")
-            
+
         self.model = Model("model")
         self.recognizer = KaldiRecognizer(self.model, self.sample_rate)
-        
-    def listen(self):
+
+    def listen(self, on_partial=None):
+        """Record from the microphone until end of speech and return the text"""
         print("Recording... Speak now!")
         try:
-            # Record audio
-            recording = sd.rec(
-                int(self.sample_rate * self.duration),
-                samplerate=self.sample_rate,
-                channels=self.channels,
-                dtype=np.int16
-            )
-            sd.wait()  # Wait until recording is finished
-            
-            # Convert to format expected by Vosk
-            self.recognizer.AcceptWaveform(recording.tobytes())
-            result = json.loads(self.recognizer.FinalResult())
-            
-            if 'text' in result:
-                return result['text']
-            return None
-                
+            with telemetry.stage("listen"):
+                return self.recognize_stream(self._microphone_blocks(), on_partial)
         except Exception as e:
             print(f"Error processing audio: {e}")
-            return None 
\ No newline at end of file
+            self.recognizer.FinalResult()  # Drop the aborted utterance
+            return None
+
+    def transcribe_file(self, path, on_partial=None):
+        """Run a 16 kHz mono 16-bit WAV file through the streaming recognizer"""
+        return self.recognize_stream(self._wav_blocks(path), on_partial)
+
+    def recognize_stream(self, blocks, on_partial=None):
+        """Feed raw int16 audio blocks to Vosk until end of speech is detected"""
+        texts = []
+        audio_seconds = 0.0
+        speech_started = False
+        silence = 0.0
+        decode_start = time.perf_counter()
+
+        try:
+            for block in blocks:
+                duration = len(block) / (2 * self.channels * self.sample_rate)
+                audio_seconds += duration
+
+                # Energy based end of speech detection
+                samples = np.frombuffer(block, dtype=np.int16).astype(np.float32)
+                rms = np.sqrt(np.mean(samples ** 2)) if len(samples) else 0.0
+                if rms >= self.silence_threshold:
+                    speech_started = True
+                    silence = 0.0
+                elif speech_started:
+                    silence += duration
+
+                if self.recognizer.AcceptWaveform(block):
+                    text = json.loads(self.recognizer.Result()).get('text')
+                    if text:
+                        texts.append(text)
+                elif on_partial is not None:
+                    partial = json.loads(self.recognizer.PartialResult()).get('partial')
+                    if partial:
+                        on_partial(partial)
+
+                if speech_started and silence >= self.silence_duration:
+                    break
+                if audio_seconds >= self.max_duration:
+                    break
+        finally:
+            # Stops the microphone stream as soon as speech has ended
+            close = getattr(blocks, 'close', None)
+            if close is not None:
+                close()
+
+        endpoint = time.perf_counter()
+        text = json.loads(self.recognizer.FinalResult()).get('text')
+        if text:
+            texts.append(text)
+
+        self.last_stats = {
+            'audio_seconds': audio_seconds,
+            'decode_seconds': time.perf_counter() - decode_start,
+            'finalize_seconds': time.perf_counter() - endpoint,
+        }
+        return " ".join(texts) if texts else None
+
+    def _microphone_blocks(self):
+        """Yield audio blocks from an input stream callback as they arrive
+
+        Stops after max_duration of wall-clock time even if the device
+        delivers less audio, and raises TimeoutError if it delivers nothing
+        for device_timeout seconds.
+        """
+        blocks = queue.Queue()
+
+        def callback(indata, frames, time_info, status):
+            blocks.put(bytes(indata))
+
+        with sd.RawInputStream(samplerate=self.sample_rate, blocksize=self.block_size,
+                               channels=self.channels, dtype='int16', callback=callback):
+            deadline = time.monotonic() + self.max_duration
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield blocks.get(timeout=min(remaining, self.device_timeout))
+                except queue.Empty:
+                    if time.monotonic() >= deadline:
+                        return
+                    raise TimeoutError(f"No audio from the input device for {self.device_timeout:.1f} s")
+
+    def _wav_blocks(self, path):
+        with wave.open(path, 'rb') as wav:
+            if (wav.getframerate() != self.sample_rate or wav.getnchannels() != self.channels
+                    or wav.getsampwidth() != 2):
+                raise ValueError(f"{path} must be {self.sample_rate} Hz mono 16-bit PCM")
+            while True:
+                block = wav.readframes(self.block_size)
+                if not block:
+                    break
+                yield block